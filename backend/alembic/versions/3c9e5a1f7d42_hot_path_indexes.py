@@ -0,0 +1,64 @@
+"""Hot path indexes
+
+Revision ID: 3c9e5a1f7d42
+Revises: 7204672b62b2
+Create Date: 2026-10-18 11:02:37.418265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e5a1f7d42'
+down_revision: Union[str, None] = '7204672b62b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # submit used to insert a second mastery row for the same concept on
+    # concurrent attempts; fold duplicates into the oldest row so the
+    # unique index can be built
+    op.execute(sa.text("""
+        UPDATE concept_mastery
+        SET correct_attempts = (
+                SELECT SUM(COALESCE(c.correct_attempts, 0)) FROM concept_mastery c
+                WHERE c.user_id = concept_mastery.user_id
+                  AND c.subject = concept_mastery.subject
+                  AND c.concept = concept_mastery.concept
+            ),
+            total_attempts = (
+                SELECT SUM(COALESCE(c.total_attempts, 0)) FROM concept_mastery c
+                WHERE c.user_id = concept_mastery.user_id
+                  AND c.subject = concept_mastery.subject
+                  AND c.concept = concept_mastery.concept
+            )
+        WHERE id IN (
+            SELECT MIN(id) FROM concept_mastery
+            WHERE user_id IS NOT NULL
+            GROUP BY user_id, subject, concept
+            HAVING COUNT(*) > 1
+        )
+    """))
+    op.execute(sa.text("""
+        DELETE FROM concept_mastery
+        WHERE user_id IS NOT NULL
+          AND id NOT IN (
+            SELECT MIN(id) FROM concept_mastery
+            WHERE user_id IS NOT NULL
+            GROUP BY user_id, subject, concept
+        )
+    """))
+
+    op.create_index('uq_concept_mastery_user_id_subject_concept', 'concept_mastery', ['user_id', 'subject', 'concept'], unique=True)
+    op.create_index('ix_concept_mastery_user_id_total_attempts', 'concept_mastery', ['user_id', 'total_attempts'], unique=False)
+    op.create_index('ix_learning_sessions_user_id_is_active', 'learning_sessions', ['user_id', 'is_active'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_learning_sessions_user_id_is_active', table_name='learning_sessions')
+    op.drop_index('ix_concept_mastery_user_id_total_attempts', table_name='concept_mastery')
+    op.drop_index('uq_concept_mastery_user_id_subject_concept', table_name='concept_mastery')
@@ -0,0 +1,27 @@
+"""User token version
+
+Revision ID: 9d41b7e2c5a8
+Revises: 3c9e5a1f7d42
+Create Date: 2026-10-18 16:24:51.903117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d41b7e2c5a8'
+down_revision: Union[str, None] = '3c9e5a1f7d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
@@ -3,19 +3,97 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # App
     PROJECT_NAME: str = "BackBencher AI Tutor"
+    WARMUP_ON_STARTUP: bool = False  # load embeddings + vector store at startup
     
     # Database
     DATABASE_URL: str = "sqlite:///./backbencher.db"
+    DB_BUSY_TIMEOUT_MS: int = 5000  # SQLite: wait this long on a locked db
+    SQLITE_WAL: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456  # bytes of the db file read via mmap
+    DB_POOL_SIZE: int = 10  # PostgreSQL connection pool
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # seconds to wait for a pooled connection
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_STATEMENT_TIMEOUT_MS: int = 15000  # PostgreSQL statement_timeout
     
     # LLM
     LLAMA_SERVER_URL: str = "http://127.0.0.1:8081/v1/completions"
+    # comma-separated completion URLs; overrides LLAMA_SERVER_URL when set
+    LLAMA_SERVER_URLS: str = ""
     LLM_MODEL: str = "phi-3"
     LLM_TIMEOUT: int = 60
+    LLM_MAX_CONNECTIONS: int = 32
+    LLM_MAX_IN_FLIGHT: int = 4  # concurrent generations sent to the server
+    LLM_MAX_QUEUE: int = 64
+    LLM_MAX_QUEUE_PER_USER: int = 4
+    LLM_QUEUE_TIMEOUT: int = 30  # seconds a request may wait for a slot
+    LLM_RETRIES: int = 2  # extra attempts on other backends
+    LLM_CIRCUIT_FAILURES: int = 3
+    LLM_CIRCUIT_COOLDOWN: int = 30  # seconds
+    LLM_HEALTH_INTERVAL: int = 10  # seconds, 0 = no health checks
+    RESPONSE_CACHE_SIZE: int = 1024
+    RESPONSE_CACHE_THRESHOLD: float = 0.95  # cosine similarity of questions
+    RESPONSE_CACHE_TTL: int = 86400  # seconds, 0 = never expire
+
+    # Vector store
+    VECTOR_STORE_DIR: str = "vector_store"
+    VECTOR_INDEX_TYPE: str = "flat"  # flat | hnsw | ivfpq
+    VECTOR_TRAIN_SAMPLE: int = 50000
+    VECTOR_HNSW_M: int = 32
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 80
+    VECTOR_HNSW_EF_SEARCH: int = 64
+    VECTOR_IVF_NLIST: int = 1024
+    VECTOR_IVF_NPROBE: int = 16
+    VECTOR_PQ_M: int = 16  # must divide the embedding dim (384)
+    VECTOR_WRITE_LOCK_TIMEOUT: float = 30  # seconds an upload waits for another writer
+
+    # Embeddings
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBED_BATCH_SIZE: int = 64
+    EMBED_PROCESSES: int = 0  # > 1 starts a multi-process pool in ingest_pdfs.py
+    QUERY_CACHE_SIZE: int = 2048
+    QUERY_CACHE_TTL: int = 3600  # seconds, 0 = never expire
+
+    # Ingestion
+    PDF_EXTRACT_WORKERS: int = 0  # 0 = one per CPU core
+    PDF_PAGES_PER_TASK: int = 16
+    INGEST_BATCH_SIZE: int = 256
+
+    # Quiz generation
+    QUIZ_BATCH_MAX: int = 20  # largest n accepted by /quiz/generate/batch
+    QUIZ_PER_CALL: int = 5  # questions asked of one generation; more fan out
+    QUIZ_TOKENS_PER_QUESTION: int = 120
+    QUIZ_CONSTRAINED: bool = True  # send the MCQ JSON schema to llama-server
+    QUIZ_BANK_WORKERS: int = 1  # background refill tasks, 0 = no quiz bank
+    QUIZ_BANK_LOW: int = 3  # refill a topic once fewer questions are banked
+    QUIZ_BANK_HIGH: int = 10  # ...up to this many
+    QUIZ_BANK_SIMILARITY: float = 0.92  # cosine above which a question is a repeat
+    QUIZ_BANK_TOPICS: int = 256
+
+    # Mastery
+    MASTERY_WEAK_THRESHOLD: float = 60  # accuracy % below which a concept is weak
+    WEAK_CONCEPTS_LIMIT: int = 5  # weakest concepts put into a chat prompt
+    WEAK_CACHE_SIZE: int = 10000  # (user, subject) weak-concept lists kept in memory
+    WEAK_CACHE_TTL: int = 60  # seconds; bounds staleness in workers that did not see a submit
     
     # Security
     SECRET_KEY: str = "your-super-secret-key-change-it-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_SIZE: int = 10000  # decoded tokens kept in memory
+    AUTH_CACHE_TTL: int = 300  # seconds, capped at the token's own expiry
+    PASSWORD_HASH_WORKERS: int = 2  # Argon2 processes, 0 = hash in the threadpool
+    PASSWORD_HASH_QUEUE: int = 64  # logins waiting for a worker before 503s
+    PASSWORD_HASH_NICE: int = 0  # > 0 lowers the hashing processes' CPU priority
+    ARGON2_TIME_COST: int = 3  # changing these rehashes passwords on next login
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+
+    @property
+    def llm_server_urls(self) -> list[str]:
+        urls = [u.strip() for u in self.LLAMA_SERVER_URLS.split(",") if u.strip()]
+        return urls or [self.LLAMA_SERVER_URL]
 
     class Config:
         env_file = ".env"
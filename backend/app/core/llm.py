@@ -1,30 +1,132 @@
-import requests
+import json
+from typing import AsyncIterator
 
+import httpx
+
+from app.core import metrics
 from app.core.config import settings
+from app.core.llm_pool import BackendPool
+from app.core.scheduler import PRIORITY_CHAT, scheduler
+from app.core.singleflight import SingleFlight, payload_key
+
+backends = BackendPool(
+    settings.llm_server_urls,
+    settings.LLM_CIRCUIT_FAILURES,
+    settings.LLM_CIRCUIT_COOLDOWN,
+    settings.LLM_HEALTH_INTERVAL,
+)
+metrics.register("llm_backends", backends.stats)
+
+inflight = SingleFlight()
+metrics.register("llm_singleflight", inflight.stats)
+
+# one keep-alive pool shared by every request; created inside the running
+# event loop on first use and closed on shutdown
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=settings.LLM_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+def start_health_checks():
+    backends.start_health_checks(get_client())
+
 
-LLAMA_SERVER_URL = settings.LLAMA_SERVER_URL
+async def close_client():
+    global _client
+    await backends.stop_health_checks()
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 
-def run_llm(prompt: str) -> str:
+def build_payload(
+    prompt: str,
+    stream: bool = False,
+    max_tokens: int = 200,
+    json_schema: dict | None = None,
+    grammar: str | None = None
+) -> dict:
     payload = {
         "model": settings.LLM_MODEL,
         "prompt": prompt,
         "temperature": 0.4,
-        "max_tokens": 200,
-        "n_predict": 200,
-        "stream": False
+        "max_tokens": max_tokens,
+        "n_predict": max_tokens,
+        "stream": stream
     }
 
-    try:
-        response = requests.post(
-            LLAMA_SERVER_URL,
-            json=payload,
-            timeout=settings.LLM_TIMEOUT
-        )
-    except requests.exceptions.Timeout:
-        raise TimeoutError("Model response timed out.")
-    except requests.exceptions.RequestException as e:
-        raise RuntimeError(f"LLM server connection failed: {str(e)}")
+    # llama-server constrained sampling: only tokens that keep the output
+    # valid are sampled, and generation ends when the grammar is complete
+    if json_schema is not None:
+        payload["json_schema"] = json_schema
+    if grammar is not None:
+        payload["grammar"] = grammar
+
+    return payload
+
+
+class _Retry(Exception):
+    pass
+
+
+async def _post(backend, payload: dict) -> httpx.Response:
+    """
+    One attempt against one backend. Connection errors and 5xx raise
+    _Retry so the caller can try another node; generations have no side
+    effects, so repeating one elsewhere is safe.
+    """
+    with backends.request(backend):
+        try:
+            response = await get_client().post(backend.url, json=payload)
+        except httpx.TimeoutException as e:
+            backends.failed(backend, e)
+            raise TimeoutError("Model response timed out.")
+        except httpx.HTTPError as e:
+            backends.failed(backend, e)
+            raise _Retry(f"LLM server connection failed: {str(e)}")
+
+    if response.status_code >= 500:
+        backends.failed(backend, RuntimeError(response.status_code))
+        raise _Retry(f"LLM server returned error: {response.text}")
+
+    backends.succeeded(backend)
+    return response
+
+
+async def _complete(payload: dict) -> httpx.Response:
+    tried = []
+    error = "No LLM server configured."
+
+    for _ in range(settings.LLM_RETRIES + 1):
+        backend = backends.pick(exclude=tried)
+        if backend is None:
+            break
+        if tried:
+            backends.retries += 1
+        tried.append(backend)
+
+        try:
+            return await _post(backend, payload)
+        except _Retry as e:
+            error = str(e)
+
+    raise RuntimeError(error)
+
+
+async def _generate(payload: dict, user_id, priority: int) -> str:
+    async with scheduler.slot(user_id, priority):
+        response = await _complete(payload)
 
     if response.status_code != 200:
         raise RuntimeError(f"LLM server returned error: {response.text}")
@@ -35,3 +137,107 @@ def run_llm(prompt: str) -> str:
         raise ValueError("No response generated by the model.")
 
     return data["choices"][0]["text"].strip()
+
+
+async def run_llm(
+    prompt: str,
+    user_id=None,
+    priority: int = PRIORITY_CHAT,
+    max_tokens: int = 200,
+    json_schema: dict | None = None,
+    grammar: str | None = None,
+    coalesce: bool = True
+) -> str:
+    """
+    Complete prompt. json_schema (a JSON Schema) or grammar (GBNF) makes
+    the server constrain its output to match. coalesce=False always runs
+    a generation of its own, for callers that need a fresh sample rather
+    than the answer someone else is already getting.
+    """
+    payload = build_payload(
+        prompt, max_tokens=max_tokens, json_schema=json_schema, grammar=grammar
+    )
+    if not coalesce:
+        return await _generate(payload, user_id, priority)
+
+    # identical prompt + sampling params already in flight (a whole class
+    # asking "explain 3NF") share one generation
+    return await inflight.do(
+        payload_key(payload),
+        lambda: _generate(payload, user_id, priority)
+    )
+
+
+async def stream_llm(prompt: str) -> AsyncIterator[str]:
+    """
+    Yield completion text deltas as the server produces them. Closing the
+    generator early (client went away) closes the upstream connection,
+    which makes llama-server stop generating.
+
+    A failing backend is retried on another one only until the first
+    token has been sent. Not scheduled: callers hold a scheduler slot for
+    the whole stream.
+    """
+    payload = build_payload(prompt, stream=True)
+    tried = []
+    error = "No LLM server configured."
+
+    for _ in range(settings.LLM_RETRIES + 1):
+        backend = backends.pick(exclude=tried)
+        if backend is None:
+            break
+        if tried:
+            backends.retries += 1
+        tried.append(backend)
+
+        started = False
+        with backends.request(backend):
+            try:
+                async with get_client().stream("POST", backend.url, json=payload) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        error = f"LLM server returned error: {response.text}"
+                        if response.status_code >= 500:
+                            backends.failed(backend, RuntimeError(response.status_code))
+                            continue
+                        backends.succeeded(backend)
+                        raise RuntimeError(error)
+
+                    async for text in _iter_deltas(response):
+                        started = True
+                        yield text
+
+                backends.succeeded(backend)
+                return
+            except httpx.TimeoutException as e:
+                backends.failed(backend, e)
+                raise TimeoutError("Model response timed out.")
+            except httpx.HTTPError as e:
+                backends.failed(backend, e)
+                error = f"LLM server connection failed: {str(e)}"
+                if started:
+                    raise RuntimeError(error)
+            except ValueError as e:
+                backends.failed(backend, e)
+                error = f"LLM server sent a malformed event: {str(e)}"
+                if started:
+                    raise RuntimeError(error)
+
+    raise RuntimeError(error)
+
+
+async def _iter_deltas(response: httpx.Response) -> AsyncIterator[str]:
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+
+        chunk = json.loads(data)
+        choices = chunk.get("choices")
+        # OpenAI-style /v1/completions or native /completion
+        text = choices[0].get("text") if choices else chunk.get("content")
+        if text:
+            yield text
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    def __init__(self, url: str):
+        self.url = url
+        parts = urlsplit(url)
+        self.health_url = f"{parts.scheme}://{parts.netloc}/health"
+
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0  # consecutive
+        self.open_until = 0.0  # 0 while the circuit is closed
+        self.probing = False
+        self.requests = 0
+        self.errors = 0
+
+    def available(self, now: float) -> bool:
+        # once the cool-down passes the breaker is half-open: one probe
+        # request is let through at a time, a failure re-opens it straight
+        # away and a success closes it
+        if not self.healthy or self.open_until > now:
+            return False
+        return not (self.open_until and self.probing)
+
+    def stats(self) -> dict:
+        return {
+            "outstanding": self.outstanding,
+            "healthy": self.healthy,
+            "circuit_open": self.open_until > time.monotonic(),
+            "consecutive_failures": self.failures,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+class BackendPool:
+    """
+    Completion servers behind run_llm.
+
+    Requests go to the available backend with the fewest outstanding
+    requests. A backend that fails failure_threshold times in a row has
+    its circuit opened for cooldown seconds; a background health check
+    marks servers whose /health stops answering as unhealthy.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        failure_threshold: int,
+        cooldown: float,
+        health_interval: float,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.health_interval = health_interval
+        self.retries = 0
+        self._health_task = None
+        self.reset(urls)
+
+    def reset(self, urls: list[str]):
+        self.backends = [Backend(url) for url in urls]
+
+    def pick(self, exclude=()) -> Backend | None:
+        now = time.monotonic()
+        candidates = [
+            b for b in self.backends if b not in exclude and b.available(now)
+        ]
+        if not candidates:
+            # everything is tripped: try whichever recovers soonest rather
+            # than failing without a single attempt
+            candidates = sorted(
+                (b for b in self.backends if b not in exclude),
+                key=lambda b: b.open_until,
+            )[:1]
+        if not candidates:
+            return None
+
+        least = min(b.outstanding for b in candidates)
+        return random.choice([b for b in candidates if b.outstanding == least])
+
+    @contextmanager
+    def request(self, backend: Backend):
+        """
+        Count a request as outstanding on backend for the duration of the
+        block, however it exits. Whether it succeeded or failed is
+        reported separately, so a cancelled caller or an unexpected error
+        leaves the backend's health alone.
+        """
+        probe = bool(backend.open_until)
+        backend.outstanding += 1
+        backend.requests += 1
+        backend.probing = backend.probing or probe
+        try:
+            yield
+        finally:
+            backend.outstanding -= 1
+            if probe:
+                backend.probing = False
+
+    def succeeded(self, backend: Backend):
+        backend.failures = 0
+        backend.open_until = 0.0
+
+    def failed(self, backend: Backend, error: Exception):
+        backend.errors += 1
+        backend.failures += 1
+        if backend.failures >= self.failure_threshold:
+            now = time.monotonic()
+            if backend.open_until <= now:
+                logger.warning("LLM backend %s circuit open: %s", backend.url, error)
+            backend.open_until = now + self.cooldown
+
+    def start_health_checks(self, client: httpx.AsyncClient):
+        if self._health_task is None and self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop(client))
+
+    async def stop_health_checks(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    async def _health_loop(self, client: httpx.AsyncClient):
+        while True:
+            await asyncio.gather(*(self._check(client, b) for b in self.backends))
+            await asyncio.sleep(self.health_interval)
+
+    async def _check(self, client: httpx.AsyncClient, backend: Backend):
+        try:
+            response = await client.get(backend.health_url, timeout=5)
+            healthy = response.status_code == 200
+        except httpx.HTTPError:
+            healthy = False
+
+        if healthy and not backend.healthy:
+            logger.info("LLM backend %s is healthy again", backend.url)
+            backend.failures = 0
+            backend.open_until = 0.0
+        elif not healthy and backend.healthy:
+            logger.warning("LLM backend %s failed its health check", backend.url)
+        backend.healthy = healthy
+
+    def stats(self) -> dict:
+        return {
+            "retries": self.retries,
+            "backends": {b.url: b.stats() for b in self.backends},
+        }
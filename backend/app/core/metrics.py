@@ -0,0 +1,46 @@
+import threading
+from collections import deque
+from typing import Callable
+
+# name -> zero-arg callable returning a JSON-serialisable dict
+_sources: dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, source: Callable[[], dict]):
+    _sources[name] = source
+
+
+def snapshot() -> dict:
+    return {name: source() for name, source in _sources.items()}
+
+
+class LatencyStats:
+    """
+    Rolling window of latencies (seconds) with count / mean / p50 / p95.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._values = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._values.append(seconds)
+            self.count += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            values = sorted(self._values)
+            count = self.count
+
+        if not values:
+            return {"count": count}
+
+        return {
+            "count": count,
+            "mean_s": round(sum(values) / len(values), 4),
+            "p50_s": round(values[len(values) // 2], 4),
+            "p95_s": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+            "max_s": round(values[-1], 4),
+        }
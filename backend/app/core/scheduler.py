@@ -0,0 +1,201 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from app.core import metrics
+from app.core.config import settings
+
+PRIORITY_CHAT = 0
+PRIORITY_QUIZ = 1
+PRIORITY_BACKGROUND = 2
+
+
+class SchedulerOverloaded(Exception):
+    """
+    Raised instead of queueing when the LLM is saturated. Mapped to a
+    429 (per-user limit) or 503 (global limit / queue timeout) response
+    with a Retry-After header in app.main.
+    """
+
+    def __init__(self, detail: str, status_code: int, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    """
+    Admission control in front of the llama server.
+
+    At most max_in_flight generations run at once; the rest wait in a
+    bounded queue. Lower priority numbers are served first (chat before
+    quiz generation before background work), and within a priority users
+    are served round-robin, so one user's burst only delays their own
+    requests.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int,
+        max_queue_per_user: int,
+        queue_timeout: float,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+
+        self._in_flight = 0
+        self._queued = 0
+        # priority -> user -> waiters; OrderedDict order is the round-robin
+        self._queues = {}
+        self._per_user = {}
+
+        self.wait_time = metrics.LatencyStats()
+        self.service_time = metrics.LatencyStats()
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def idle(self) -> bool:
+        return self._in_flight == 0 and self._queued == 0
+
+    def retry_after(self) -> int:
+        service = self.service_time.stats().get("mean_s", 1.0)
+        estimate = service * (self._queued + 1) / self.max_in_flight
+        return max(1, min(60, math.ceil(estimate)))
+
+    def admit(self, user_id):
+        """
+        Fail fast if a new request from this user could not be queued.
+        """
+        if self._in_flight < self.max_in_flight and not self._queued:
+            return
+
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise SchedulerOverloaded(
+                "The tutor is busy right now. Please try again shortly.",
+                503,
+                self.retry_after(),
+            )
+
+        if self._per_user.get(user_id, 0) >= self.max_queue_per_user:
+            self.rejected += 1
+            raise SchedulerOverloaded(
+                "Too many requests in progress. Please wait for them to finish.",
+                429,
+                self.retry_after(),
+            )
+
+    async def acquire(self, user_id, priority: int = PRIORITY_CHAT):
+        if self._in_flight < self.max_in_flight and not self._queued:
+            self._in_flight += 1
+            self.wait_time.observe(0.0)
+            return
+
+        self.admit(user_id)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(priority, OrderedDict()).setdefault(
+            user_id, deque()
+        ).append(waiter)
+        self._queued += 1
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just as we gave up
+                self.release()
+            else:
+                waiter.cancel()
+                self._remove(priority, user_id, waiter)
+
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise SchedulerOverloaded(
+                    "The tutor is busy right now. Please try again shortly.",
+                    503,
+                    self.retry_after(),
+                )
+            raise
+
+        self.wait_time.observe(time.monotonic() - started)
+
+    def release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_id=None, priority: int = PRIORITY_CHAT):
+        await self.acquire(user_id, priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.service_time.observe(time.monotonic() - started)
+            self.release()
+
+    def _dispatch(self):
+        while self._in_flight < self.max_in_flight and self._queued:
+            priority = min(p for p, users in self._queues.items() if users)
+            users = self._queues[priority]
+
+            user_id, waiters = next(iter(users.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                users.move_to_end(user_id)
+            else:
+                del users[user_id]
+
+            self._dequeued(user_id)
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    def _remove(self, priority, user_id, waiter):
+        users = self._queues.get(priority, {})
+        waiters = users.get(user_id)
+        if waiters is None or waiter not in waiters:
+            return
+
+        waiters.remove(waiter)
+        if not waiters:
+            del users[user_id]
+        self._dequeued(user_id)
+
+    def _dequeued(self, user_id):
+        self._queued -= 1
+        self._per_user[user_id] -= 1
+        if not self._per_user[user_id]:
+            del self._per_user[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self._queued,
+            "queue_depth_by_priority": {
+                p: sum(len(w) for w in users.values())
+                for p, users in self._queues.items()
+            },
+            "rejected": self.rejected,
+            "queue_timeouts": self.timeouts,
+            "wait_time": self.wait_time.stats(),
+            "service_time": self.service_time.stats(),
+        }
+
+
+scheduler = LLMScheduler(
+    settings.LLM_MAX_IN_FLIGHT,
+    settings.LLM_MAX_QUEUE,
+    settings.LLM_MAX_QUEUE_PER_USER,
+    settings.LLM_QUEUE_TIMEOUT,
+)
+metrics.register("llm_scheduler", scheduler.stats)
@@ -1,13 +1,65 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from app.core.config import settings
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        # WAL: readers no longer block behind a writer (and vice versa);
+        # NORMAL is durable in WAL mode except for the last commits on
+        # power loss, and saves an fsync per commit
+        if settings.SQLITE_WAL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str | None = None) -> Engine:
+    """
+    Engine tuned for the backend in url (DATABASE_URL by default):
+    SQLite gets WAL and friends on every connection, PostgreSQL a sized
+    connection pool with pre-ping and a per-statement timeout.
+    """
+    url = make_url(url or DATABASE_URL)
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,
+                # seconds the driver waits on a locked database
+                "timeout": settings.DB_BUSY_TIMEOUT_MS / 1000,
+            },
+        )
+        event.listen(engine, "connect", _sqlite_pragmas)
+        return engine
+
+    if backend == "postgresql":
+        return create_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args={
+                "options": f"-c statement_timeout={int(settings.DB_STATEMENT_TIMEOUT_MS)}"
+            },
+        )
+
+    return create_engine(url, pool_pre_ping=True)
+
+
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(
     autocommit=False,
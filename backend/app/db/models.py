@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from datetime import datetime
 from app.db.database import Base
 from sqlalchemy import ForeignKey, Text
@@ -11,6 +11,8 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # carried in tokens as "ver"; bumping it revokes every token issued so far
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 
 class LearningSession(Base):
@@ -24,6 +26,10 @@ class LearningSession(Base):
 
     user = relationship("User")
 
+    __table_args__ = (
+        Index("ix_learning_sessions_user_id_is_active", "user_id", "is_active"),
+    )
+
 class Quiz(Base):
     __tablename__ = "quizzes"
 
@@ -53,3 +59,13 @@ class ConceptMastery(Base):
     concept = Column(String, nullable=False)
     correct_attempts = Column(Integer, default=0)
     total_attempts = Column(Integer, default=0)
+
+    __table_args__ = (
+        # one row per concept: submit's lookup, and the upsert target
+        Index(
+            "uq_concept_mastery_user_id_subject_concept",
+            "user_id", "subject", "concept",
+            unique=True
+        ),
+        Index("ix_concept_mastery_user_id_total_attempts", "user_id", "total_attempts"),
+    )
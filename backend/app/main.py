@@ -1,7 +1,24 @@
-from fastapi import FastAPI
+import logging
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.core.llm import close_client, start_health_checks
+from app.core.scheduler import SchedulerOverloaded
 from app.db.database import engine
 from app.db import models
-from app.routes import auth, session, chat, pdf, quiz, progress
+from app.routes import auth, session, chat, pdf, quiz, progress, metrics
+from app.services import pdf_text, rag
+from app.services.quiz_bank import quiz_bank
+from app.utils.security import hasher
+
+_import_seconds = time.perf_counter() - _import_started
+
+logger = logging.getLogger("uvicorn.error")
 
 
 app = FastAPI(title="BackBencher AI Tutor")
@@ -24,6 +41,46 @@ app.include_router(chat.router)
 app.include_router(pdf.router)
 app.include_router(quiz.router)
 app.include_router(progress.router)
+app.include_router(metrics.router)
+
+
+@app.exception_handler(SchedulerOverloaded)
+async def scheduler_overloaded(request: Request, exc: SchedulerOverloaded):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.on_event("startup")
+async def start_llm_health_checks():
+    start_health_checks()
+    quiz_bank.start()
+
+
+@app.on_event("startup")
+def startup():
+    # embeddings, faiss and pypdf load lazily on first use unless warmed up
+    warmup_seconds = 0.0
+    if settings.WARMUP_ON_STARTUP:
+        started = time.perf_counter()
+        rag.warmup()
+        warmup_seconds = time.perf_counter() - started
+
+    logger.info(
+        "Startup: imports %.2fs, warmup %.2fs (WARMUP_ON_STARTUP=%s)",
+        _import_seconds, warmup_seconds, settings.WARMUP_ON_STARTUP
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await quiz_bank.stop()
+    await close_client()
+    await hasher.shutdown()
+    await run_in_threadpool(pdf_text.shutdown_pool)
+
 
 @app.get("/")
 def health_check():
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.db.database import SessionLocal
 from app.db import models, schemas
-from app.utils.security import hash_password, verify_password
+from app.utils.security import hasher
 from app.utils.jwt import create_access_token
 
 
@@ -18,12 +19,25 @@ def get_db():
         db.close()
 
 
-@router.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(models.User).filter(
-        models.User.email == user.email
+def get_user_by_email(db: Session, email: str):
+    return db.query(models.User).filter(
+        models.User.email == email
     ).first()
 
+
+def save_user(db: Session, user: models.User):
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+# async: Argon2 runs in the hasher's process pool, so a burst of logins
+# neither blocks the event loop nor holds threadpool workers while hashing
+@router.post("/register", response_model=schemas.UserResponse)
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    existing_user = await run_in_threadpool(get_user_by_email, db, user.email)
+
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -32,30 +46,40 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
     new_user = models.User(
         email=user.email,
-        hashed_password=hash_password(user.password)
+        hashed_password=await hasher.hash(user.password)
     )
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-
-    return new_user
+    return await run_in_threadpool(save_user, db, new_user)
 
 
 @router.post("/login")
-def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(
-        models.User.email == user.email
-    ).first()
+async def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(get_user_by_email, db, user.email)
 
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+    valid, new_hash = False, None
+    if db_user:
+        valid, new_hash = await hasher.verify_and_update(
+            user.password, db_user.hashed_password
+        )
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
 
+    if new_hash:
+        # stored with outdated Argon2 parameters; not a password change,
+        # so existing tokens stay valid
+        db_user.hashed_password = new_hash
+        await run_in_threadpool(save_user, db, db_user)
+
     access_token = create_access_token(
-        data={"sub": str(db_user.id)}
+        data={
+            "sub": str(db_user.id),
+            "email": db_user.email,
+            "ver": db_user.token_version,
+        }
     )
 
     return {
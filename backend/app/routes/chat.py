@@ -1,41 +1,72 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+import json
+import time
+from typing import NamedTuple
+
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.utils.deps import get_current_user, get_db
 from app.db import models
-from app.core.llm import run_llm
+from app.core import metrics
+from app.core.llm import run_llm, stream_llm
+from app.core.scheduler import PRIORITY_CHAT, SchedulerOverloaded, scheduler
 from app.services.prompt_builder import build_teaching_prompt
-from app.services.rag import search_pdf
-from app.services.adaptive import get_weak_concepts
+from app.services.rag import embed_query, search_pdf_with_ids
+from app.services.response_cache import response_cache
+from app.services.adaptive import weak_concept_cache
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+first_token_latency = metrics.LatencyStats()
+metrics.register("chat_stream_first_token", first_token_latency.stats)
 
-@router.post("/")
-def chat(
-    message: str = Query(..., min_length=3),
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user)
-):
-    session = db.query(models.LearningSession).filter(
-        models.LearningSession.user_id == user.id,
+
+class ChatTurn(NamedTuple):
+    subject: str
+    prompt: str
+    cache_key: tuple
+    query_vec: object
+    pdf_version: str | None
+    cached_answer: str | None
+
+
+def get_active_session(db: Session, user_id: int):
+    return db.query(models.LearningSession).filter(
+        models.LearningSession.user_id == user_id,
         models.LearningSession.is_active == 1
     ).first()
 
+
+async def prepare_chat(db: Session, user, message: str) -> ChatTurn | None:
+    session = await run_in_threadpool(get_active_session, db, user.id)
+
     if not session:
-        return {"error": "No active learning session"}
+        return None
 
-    pdf_chunks = []
+    pdf_version, chunk_ids, pdf_chunks = None, [], []
 
     if session.subject.lower() in ["dbms", "database", "database management system"]:
-        pdf_chunks = search_pdf(message)
+        pdf_version, chunk_ids, pdf_chunks = await run_in_threadpool(
+            search_pdf_with_ids, message
+        )
 
 
-    weak_concepts = get_weak_concepts(
-        db=db,
-        user_id=user.id,
-        subject=session.subject
-    )
+    # usually cached, and kept current by quiz submit; no thread hop on a hit
+    weak_concepts = weak_concept_cache.cached(user.id, session.subject)
+    if weak_concepts is None:
+        weak_concepts = await run_in_threadpool(
+            weak_concept_cache.load,
+            db=db,
+            user_id=user.id,
+            subject=session.subject
+        )
+
+    cache_key = response_cache.key(session.subject, chunk_ids, weak_concepts)
+    query_vec = await run_in_threadpool(embed_query, message)
+
+    cached_answer = response_cache.get(cache_key, query_vec, pdf_version)
 
     prompt = build_teaching_prompt(
         subject=session.subject,
@@ -44,9 +75,33 @@ def chat(
         weak_concepts=weak_concepts
     )
 
+    return ChatTurn(
+        session.subject, prompt, cache_key, query_vec, pdf_version, cached_answer
+    )
+
+
+# async so a slow generation only holds an event-loop await, not one of the
+# threadpool workers; blocking DB / embedding work is pushed to the pool
+@router.post("/")
+async def chat(
+    message: str = Query(..., min_length=3),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    turn = await prepare_chat(db, user, message)
+
+    if not turn:
+        return {"error": "No active learning session"}
+
+    if turn.cached_answer is not None:
+        return {
+            "subject": turn.subject,
+            "question": message,
+            "answer": turn.cached_answer
+        }
 
     try:
-        answer = run_llm(prompt)
+        answer = await run_llm(turn.prompt, user_id=user.id, priority=PRIORITY_CHAT)
     except TimeoutError:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -58,8 +113,79 @@ def chat(
             detail=str(e)
         )
 
+    response_cache.put(turn.cache_key, turn.query_vec, answer, turn.pdf_version)
+
     return {
-        "subject": session.subject,
+        "subject": turn.subject,
         "question": message,
         "answer": answer
     }
+
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream(
+    request: Request,
+    message: str = Query(..., min_length=3),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """
+    Same as /chat/ but sends the answer as Server-Sent Events:
+    "token" events with {"text": delta}, then "done" with the full answer
+    (or "error"). A client disconnect stops the upstream generation.
+    """
+    started = time.perf_counter()
+    turn = await prepare_chat(db, user, message)
+
+    if not turn:
+        return {"error": "No active learning session"}
+
+    if turn.cached_answer is None:
+        # reject with 429/503 now, while a status code can still be sent
+        scheduler.admit(user.id)
+
+    async def events():
+        if turn.cached_answer is not None:
+            first_token_latency.observe(time.perf_counter() - started)
+            yield sse("token", {"text": turn.cached_answer})
+            yield sse("done", {"subject": turn.subject, "answer": turn.cached_answer})
+            return
+
+        parts = []
+        tokens = stream_llm(turn.prompt)
+        try:
+            async with scheduler.slot(user.id, PRIORITY_CHAT):
+                async for text in tokens:
+                    if await request.is_disconnected():
+                        return
+
+                    if not parts:
+                        first_token_latency.observe(time.perf_counter() - started)
+                    parts.append(text)
+                    yield sse("token", {"text": text})
+        except SchedulerOverloaded as e:
+            yield sse("error", {"detail": e.detail, "retry_after": e.retry_after})
+            return
+        except TimeoutError:
+            yield sse("error", {"detail": "Model response timed out. Please try again later."})
+            return
+        except (RuntimeError, ValueError) as e:
+            yield sse("error", {"detail": str(e)})
+            return
+        finally:
+            # runs on disconnect/cancel too: closes the upstream stream
+            await tokens.aclose()
+
+        answer = "".join(parts).strip()
+        response_cache.put(turn.cache_key, turn.query_vec, answer, turn.pdf_version)
+        yield sse("done", {"subject": turn.subject, "answer": answer})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
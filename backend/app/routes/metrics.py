@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from app.core import metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/")
+def get_metrics():
+    return metrics.snapshot()
@@ -1,12 +1,10 @@
 import os
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
 
+from app.core.config import settings
 from app.utils.deps import get_current_user
-from app.services.rag import (
-    extract_text_from_pdf,
-    chunk_text,
-    store_pdf_vectors,
-)
+from app.services.rag import ingest_pdf
+from app.services.vector_store import WriterBusy
 
 router = APIRouter(prefix="/pdf", tags=["PDF RAG"])
 
@@ -24,12 +22,18 @@ def upload_pdf(
     with open(pdf_path, "wb") as f:
         f.write(file.file.read())
 
-    text = extract_text_from_pdf(pdf_path)
-    chunks = chunk_text(text)
-
-    store_pdf_vectors(chunks)
+    # a long ingest_pdfs.py run holds the store; do not tie up a
+    # threadpool worker waiting for it
+    try:
+        chunks = ingest_pdf(pdf_path, lock_timeout=settings.VECTOR_WRITE_LOCK_TIMEOUT)
+    except WriterBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{e}. Please try the upload again later.",
+            headers={"Retry-After": str(max(1, round(settings.VECTOR_WRITE_LOCK_TIMEOUT)))}
+        )
 
     return {
         "message": "PDF uploaded and indexed successfully",
-        "chunks": len(chunks)
+        "chunks": chunks
     }
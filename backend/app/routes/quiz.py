@@ -1,28 +1,26 @@
 import json
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
 from app.db import models
+from app.core.config import settings
 from app.utils.deps import get_db, get_current_user
-from app.services.quiz_generator import generate_mcq
+from app.services.adaptive import weak_concept_cache
+from app.services.mastery import weak_concepts
+from app.services.quiz_bank import quiz_bank
+from app.services.quiz_generator import generate_mcq, generate_mcq_batch
 
 router = APIRouter(prefix="/quiz", tags=["Quiz"])
 
+_UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
 
-@router.post("/generate")
-def generate_quiz(
-    subject: str,
-    context: str,
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user)
-):
-    quiz_data = generate_mcq(subject, context)
-
-    if not quiz_data:
-        return {"error": "Quiz generation failed"}
 
+def save_quiz(db: Session, user_id: int, subject: str, quiz_data: dict):
     quiz = models.Quiz(
-        user_id=user.id,
+        user_id=user_id,
         subject=subject,
         question=quiz_data["question"],
         options=json.dumps(quiz_data["options"]),
@@ -32,6 +30,47 @@ def generate_quiz(
     db.add(quiz)
     db.commit()
     db.refresh(quiz)
+    return quiz
+
+
+def save_quizzes(db: Session, user_id: int, subject: str, quizzes: list[dict]) -> list[int]:
+    rows = [
+        models.Quiz(
+            user_id=user_id,
+            subject=subject,
+            question=quiz_data["question"],
+            options=json.dumps(quiz_data["options"]),
+            correct_answer=quiz_data["correct_answer"]
+        )
+        for quiz_data in quizzes
+    ]
+
+    db.add_all(rows)
+    # ids are assigned on flush; read them before commit expires the rows
+    db.flush()
+    ids = [row.id for row in rows]
+    db.commit()
+    return ids
+
+
+@router.post("/generate")
+async def generate_quiz(
+    subject: str,
+    context: str,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    # banked questions are served instantly; a miss also queues the topic
+    # for background refill
+    quiz_data = quiz_bank.take(subject, context)
+    if quiz_data is None:
+        quiz_data = await generate_mcq(subject, context, user_id=user.id)
+        quiz_bank.served(subject, context, quiz_data)
+
+    if not quiz_data:
+        return {"error": "Quiz generation failed"}
+
+    quiz = await run_in_threadpool(save_quiz, db, user.id, subject, quiz_data)
 
     return {
         "quiz_id": quiz.id,
@@ -40,42 +79,77 @@ def generate_quiz(
     }
 
 
-@router.post("/submit")
-def submit_quiz(
-    quiz_id: int,
-    selected_answer: str,
+@router.post("/generate/batch")
+async def generate_quiz_batch(
+    subject: str,
+    context: str,
+    n: int = Query(10, ge=1, le=settings.QUIZ_BATCH_MAX),
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
-    quiz = db.query(models.Quiz).filter_by(id=quiz_id).first()
+    quizzes = await generate_mcq_batch(subject, context, n, user_id=user.id)
 
-    if not quiz:
-        return {"error": "Quiz not found"}
+    if not quizzes:
+        return {"error": "Quiz generation failed"}
 
-    is_correct = int(selected_answer == quiz.correct_answer)
+    ids = await run_in_threadpool(save_quizzes, db, user.id, subject, quizzes)
 
-    attempt = models.QuizAttempt(
-        user_id=user.id,
-        quiz_id=quiz.id,
-        selected_answer=selected_answer,
-        is_correct=is_correct
-    )
+    return {
+        "requested": n,
+        "generated": len(quizzes),
+        "quizzes": [
+            {
+                "quiz_id": quiz_id,
+                "question": quiz_data["question"],
+                "options": quiz_data["options"]
+            }
+            for quiz_id, quiz_data in zip(ids, quizzes)
+        ]
+    }
 
-    db.add(attempt)
 
-    # ---- UPDATE CONCEPT MASTERY ----
-    concept = quiz.question  # simple mapping for now
+def mastery_upsert(user_id: int, subject: str, concept: str, is_correct: int, dialect: str):
+    """
+    One INSERT ... ON CONFLICT DO UPDATE on the (user_id, subject, concept)
+    unique index: the counters are incremented by the database, so
+    concurrent submits neither lose updates nor create duplicate rows.
+    dialect is one of _UPSERTS.
+    """
+    mastery = models.ConceptMastery
+    stmt = _UPSERTS[dialect](mastery).values(
+        user_id=user_id,
+        subject=subject,
+        concept=concept,
+        correct_attempts=is_correct,
+        total_attempts=1
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[mastery.user_id, mastery.subject, mastery.concept],
+        set_={
+            "total_attempts": mastery.total_attempts + 1,
+            "correct_attempts": mastery.correct_attempts + stmt.excluded.correct_attempts
+        }
+    )
 
+
+def locked_mastery_update(
+    db: Session, user_id: int, subject: str, concept: str, is_correct: int
+) -> tuple[int, int]:
+    """
+    Portable fallback for databases without an upsert here: SELECT ... FOR
+    UPDATE serializes submits on an existing row. Two first submits on the
+    same concept can still race on the unique index, as they always could.
+    """
     mastery = db.query(models.ConceptMastery).filter_by(
-        user_id=user.id,
-        subject=quiz.subject,
+        user_id=user_id,
+        subject=subject,
         concept=concept
-    ).first()
+    ).with_for_update().first()
 
     if not mastery:
         mastery = models.ConceptMastery(
-            user_id=user.id,
-            subject=quiz.subject,
+            user_id=user_id,
+            subject=subject,
             concept=concept,
             correct_attempts=0,
             total_attempts=0
@@ -83,11 +157,60 @@ def submit_quiz(
         db.add(mastery)
 
     mastery.total_attempts += 1
-    if is_correct:
-        mastery.correct_attempts += 1
+    mastery.correct_attempts += is_correct
+    db.flush()
+    return mastery.correct_attempts, mastery.total_attempts
+
+
+def update_mastery(
+    db: Session, user_id: int, subject: str, concept: str, is_correct: int
+) -> tuple[int, int]:
+    """
+    Count one attempt on a concept; returns the new (correct_attempts,
+    total_attempts).
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect not in _UPSERTS:
+        return locked_mastery_update(db, user_id, subject, concept, is_correct)
 
+    mastery = models.ConceptMastery
+    return tuple(db.execute(
+        mastery_upsert(user_id, subject, concept, is_correct, dialect)
+        .returning(mastery.correct_attempts, mastery.total_attempts)
+    ).one())
+
+
+@router.post("/submit")
+def submit_quiz(
+    quiz_id: int,
+    selected_answer: str,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    quiz = db.query(models.Quiz).filter_by(id=quiz_id, user_id=user.id).first()
+
+    if not quiz:
+        return {"error": "Quiz not found"}
+
+    is_correct = int(selected_answer == quiz.correct_answer)
+
+    db.execute(insert(models.QuizAttempt).values(
+        user_id=user.id,
+        quiz_id=quiz.id,
+        selected_answer=selected_answer,
+        is_correct=is_correct
+    ))
+
+    # ---- UPDATE CONCEPT MASTERY ----
+    concept = quiz.question  # simple mapping for now
+
+    correct_attempts, total_attempts = update_mastery(
+        db, user.id, quiz.subject, concept, is_correct
+    )
     db.commit()
 
+    # keep the chat prompt's weak-concept list current without re-reading it
+    weak_concept_cache.record(user.id, quiz.subject, concept, correct_attempts, total_attempts)
 
     return {
         "correct": bool(is_correct),
@@ -96,23 +219,8 @@ def submit_quiz(
 
 @router.get("/recommend")
 def recommend_quiz(
+    limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
-    weak = db.query(models.ConceptMastery).filter(
-        models.ConceptMastery.user_id == user.id,
-        models.ConceptMastery.total_attempts > 0
-    ).all()
-
-    recommendations = []
-
-    for w in weak:
-        accuracy = (w.correct_attempts / w.total_attempts) * 100
-        if accuracy < 60:
-            recommendations.append({
-                "subject": w.subject,
-                "concept": w.concept,
-                "accuracy": round(accuracy, 2)
-            })
-
-    return recommendations
+    return weak_concepts(db, user.id, limit=limit)
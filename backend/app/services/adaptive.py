@@ -1,22 +1,143 @@
+import threading
+
 from sqlalchemy.orm import Session
-from app.db import models
+
+from app.core import metrics
+from app.core.config import settings
+from app.services.mastery import weak_concept_counts
+from app.utils.cache import LRUCache
+
+_STRIPES = 1024
+
+
+class WeakConceptCache:
+    """
+    Each (user, subject)'s weakest concepts, as get_weak_concepts returns
+    them, kept between chat messages.
+
+    Mastery only changes on quiz submit, which calls record() with the
+    concept's new counters: the cached list is updated in place, so chat
+    needs no mastery query in steady state. When the list was cut at the
+    limit and a listed concept improves, whatever should replace it is not
+    cached, so the entry is dropped instead. The store is anything with
+    LRUCache's get/peek/set/pop/stats; by default an in-process LRU that evicts
+    idle users.
+
+    Write-through only reaches the process that handled the submit: with
+    several workers, the others keep serving their copy until its TTL
+    (WEAK_CACHE_TTL) runs out. A store shared by the workers does not fix
+    that on its own, since record() is a read-modify-write on the entry.
+    """
+
+    def __init__(self, store, limit: int, threshold: float):
+        self.store = store
+        self.limit = limit
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # bumped on every submit; a load that raced with one is not stored
+        self._versions = [0] * _STRIPES
+        self.updates = 0
+        self.invalidations = 0
+
+    def _stripe(self, key) -> int:
+        return hash(key) % _STRIPES
+
+    @staticmethod
+    def _display(ranked) -> list[dict]:
+        return [
+            {"concept": concept, "accuracy": round(ratio, 2)}
+            for ratio, _, concept in ranked
+        ]
+
+    def cached(self, user_id: int, subject: str) -> list[dict] | None:
+        """
+        The cached list, or None on a miss; never touches the database.
+        """
+        entry = self.store.get((user_id, subject))
+        return None if entry is None else self._display(entry[0])
+
+    def load(self, db: Session, user_id: int, subject: str) -> list[dict]:
+        """
+        Query the list and cache it; for callers that just missed cached().
+        """
+        key = (user_id, subject)
+        version = self._versions[self._stripe(key)]
+        # one extra row tells whether the list is complete
+        rows = weak_concept_counts(
+            db, user_id, subject=subject, limit=self.limit + 1, threshold=self.threshold
+        )
+        # ranked like the query: accuracy as the database computes it,
+        # unrounded, then most attempted, then concept
+        ranked = [
+            (correct * 100.0 / total, -total, concept)
+            for concept, correct, total in rows[:self.limit]
+        ]
+        with self._lock:
+            # a submit recorded meanwhile may not be in rows
+            if self._versions[self._stripe(key)] == version:
+                self.store.set(key, (ranked, len(rows) <= self.limit))
+
+        return self._display(ranked)
+
+    def get(self, db: Session, user_id: int, subject: str) -> list[dict]:
+        hit = self.cached(user_id, subject)
+        return hit if hit is not None else self.load(db, user_id, subject)
+
+    def record(
+        self, user_id: int, subject: str, concept: str, correct_attempts: int, total_attempts: int
+    ):
+        """
+        Write-through after a submit has committed the concept's counters.
+        """
+        key = (user_id, subject)
+
+        with self._lock:
+            self._versions[self._stripe(key)] += 1
+
+            # a submit is not a lookup: keep the hit rate about chat
+            entry = self.store.peek(key)
+            if entry is None:
+                return
+            ranked, complete = entry
+
+            # same comparison as the weak_concepts query
+            weak = total_attempts > 0 and correct_attempts * 100 < total_attempts * self.threshold
+            ratio = correct_attempts * 100.0 / total_attempts if total_attempts else 0.0
+            new = (ratio, -total_attempts, concept)
+            old = next((r for r in ranked if r[2] == concept), None)
+
+            if not complete and old is not None and (not weak or new > old):
+                self.store.pop(key)
+                self.invalidations += 1
+                return
+
+            ranked = [r for r in ranked if r[2] != concept]
+            if weak:
+                ranked.append(new)
+                ranked.sort()
+            if len(ranked) > self.limit:
+                ranked, complete = ranked[:self.limit], False
+
+            self.store.set(key, (ranked, complete))
+            self.updates += 1
+
+    def stats(self) -> dict:
+        return {
+            **self.store.stats(),
+            "write_through_updates": self.updates,
+            "invalidations": self.invalidations,
+        }
+
+
+weak_concept_cache = WeakConceptCache(
+    LRUCache(settings.WEAK_CACHE_SIZE, settings.WEAK_CACHE_TTL),
+    settings.WEAK_CONCEPTS_LIMIT,
+    settings.MASTERY_WEAK_THRESHOLD,
+)
+metrics.register("weak_concept_cache", weak_concept_cache.stats)
 
 
 def get_weak_concepts(db: Session, user_id: int, subject: str):
-    records = db.query(models.ConceptMastery).filter_by(
-        user_id=user_id,
-        subject=subject
-    ).all()
-
-    weak = []
-
-    for r in records:
-        if r.total_attempts > 0:
-            accuracy = (r.correct_attempts / r.total_attempts) * 100
-            if accuracy < 60:
-                weak.append({
-                    "concept": r.concept,
-                    "accuracy": round(accuracy, 2)
-                })
-
-    return weak
+    # runs on every chat message: served from the cache, which quiz submit
+    # keeps current; on a miss the filtering, ordering and limit happen in SQL
+    return weak_concept_cache.get(db, user_id, subject)
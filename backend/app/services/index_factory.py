@@ -0,0 +1,176 @@
+import numpy as np
+
+from app.core.config import settings
+from app.utils.lazy import lazy_import
+
+faiss = lazy_import("faiss")
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+
+def min_train_size(index_type: str | None = None) -> int:
+    index_type = index_type or settings.VECTOR_INDEX_TYPE
+    if index_type == "ivfpq":
+        # faiss wants ~39 points per centroid, and PQ needs 256 per codebook
+        return max(settings.VECTOR_IVF_NLIST * 39, 256)
+    return 0
+
+
+def create_index(dim: int, vectors=None, index_type: str | None = None):
+    """
+    Build an empty index of the configured type that takes add_with_ids,
+    trained on a sample of vectors when the type needs it. Falls back to
+    Flat while there are too few vectors to train on; rebuild_if_needed
+    upgrades it later.
+
+    Flat and HNSW are wrapped in an IndexIDMap2. IVF-PQ keeps ids in its
+    own inverted lists instead: IndexIDMap2 does not keep its id map in
+    step with removals over IVF.
+    """
+    index_type = index_type or settings.VECTOR_INDEX_TYPE
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown VECTOR_INDEX_TYPE: {index_type}")
+
+    n = 0 if vectors is None else len(vectors)
+    if n < min_train_size(index_type):
+        index_type = "flat"
+
+    if index_type == "hnsw":
+        inner = faiss.IndexHNSWFlat(dim, settings.VECTOR_HNSW_M)
+        inner.hnsw.efConstruction = settings.VECTOR_HNSW_EF_CONSTRUCTION
+    elif index_type == "ivfpq":
+        quantizer = faiss.IndexFlatL2(dim)
+        inner = faiss.IndexIVFPQ(
+            quantizer, dim, settings.VECTOR_IVF_NLIST, settings.VECTOR_PQ_M, 8
+        )
+        inner.train(_train_sample(vectors))
+        return _with_direct_map(inner)
+    else:
+        inner = faiss.IndexFlatL2(dim)
+
+    index = faiss.IndexIDMap2(inner)
+    configure_search(index)
+    return index
+
+
+def _inner(index):
+    return faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+
+
+def _with_direct_map(index):
+    # id -> list position, so remove_ids and reconstruct work on the ids
+    index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    configure_search(index)
+    return index
+
+
+def index_type_of(index) -> str:
+    inner = _inner(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+
+def configure_search(index):
+    inner = _inner(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = settings.VECTOR_HNSW_EF_SEARCH
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = settings.VECTOR_IVF_NPROBE
+
+
+def export_vectors(index) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (vectors, ids) currently stored in an index from create_index. IVF-PQ
+    vectors are reconstructed from their codes, so they are approximate.
+    """
+    if isinstance(index, faiss.IndexIVF):
+        ids = _ivf_ids(index)
+        if not len(ids):
+            return np.empty((0, index.d), dtype=np.float32), ids
+        if index.direct_map.type != faiss.DirectMap.Hashtable:
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index.reconstruct_batch(ids), ids
+
+    inner = faiss.downcast_index(index.index)
+    ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+    if not len(ids):
+        return np.empty((0, index.d), dtype=np.float32), ids
+
+    if isinstance(inner, faiss.IndexIVF):
+        inner.make_direct_map()
+    return inner.reconstruct_n(0, inner.ntotal), ids
+
+
+def prepare_for_writes(index):
+    """
+    Make a loaded index safe for add_with_ids / remove_ids. Stores written
+    before IVF-PQ dropped its IndexIDMap2 wrapper are unwrapped, keeping
+    the trained quantizer and codebooks.
+    """
+    if isinstance(index, faiss.IndexIVF):
+        if index.direct_map.type != faiss.DirectMap.Hashtable:
+            return _with_direct_map(index)
+        return index
+
+    inner = _inner(index)
+    if not isinstance(inner, faiss.IndexIVF):
+        return index
+
+    vectors, ids = export_vectors(index)
+    unwrapped = faiss.clone_index(inner)
+    unwrapped.reset()
+    _with_direct_map(unwrapped)
+    if len(ids):
+        unwrapped.add_with_ids(vectors, ids)
+    return unwrapped
+
+
+def remove_ids(index, ids: np.ndarray):
+    if index_type_of(index) != "hnsw":
+        index.remove_ids(ids)
+        return index
+
+    # HNSW graphs do not support deletion; rebuild without the removed ids
+    vectors, existing = export_vectors(index)
+    keep = ~np.isin(existing, ids)
+    rebuilt = create_index(index.d, vectors[keep], "hnsw")
+    if keep.any():
+        rebuilt.add_with_ids(vectors[keep], existing[keep])
+    return rebuilt
+
+
+def rebuild_if_needed(index):
+    """
+    Re-create the index when VECTOR_INDEX_TYPE changed or when a Flat
+    fallback has grown large enough to train the configured type.
+    """
+    wanted = settings.VECTOR_INDEX_TYPE
+    if index_type_of(index) == wanted or index.ntotal < min_train_size(wanted):
+        return index
+
+    vectors, ids = export_vectors(index)
+    rebuilt = create_index(index.d, vectors, wanted)
+    rebuilt.add_with_ids(vectors, ids)
+    return rebuilt
+
+
+def _ivf_ids(index) -> np.ndarray:
+    invlists = index.invlists
+    return np.concatenate([np.empty(0, dtype=np.int64)] + [
+        faiss.rev_swig_ptr(invlists.get_ids(l), invlists.list_size(l)).copy()
+        for l in range(index.nlist)
+        if invlists.list_size(l)
+    ]).astype(np.int64)
+
+
+def _train_sample(vectors) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    limit = settings.VECTOR_TRAIN_SAMPLE
+    if len(vectors) <= limit:
+        return vectors
+
+    rng = np.random.default_rng(0)
+    return vectors[rng.choice(len(vectors), size=limit, replace=False)]
@@ -0,0 +1,104 @@
+from sqlalchemy import case, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+
+_mastery = models.ConceptMastery
+
+# percentage, computed by the database; 0 for concepts never attempted
+accuracy = case(
+    (_mastery.total_attempts > 0,
+     _mastery.correct_attempts * 100.0 / _mastery.total_attempts),
+    else_=0
+).label("accuracy")
+
+
+def _rows(result) -> list[dict]:
+    rows = []
+    for row in result:
+        row = row._asdict()
+        row["accuracy"] = round(float(row["accuracy"]), 2)
+        rows.append(row)
+    return rows
+
+
+def concept_progress(
+    db: Session, user_id: int, limit: int | None = None, offset: int = 0
+) -> list[dict]:
+    """
+    Every concept the user has a mastery row for, oldest first:
+    subject, concept, accuracy, attempts.
+    """
+    stmt = (
+        select(
+            _mastery.subject,
+            _mastery.concept,
+            accuracy,
+            _mastery.total_attempts.label("attempts")
+        )
+        .where(_mastery.user_id == user_id)
+        .order_by(_mastery.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    return _rows(db.execute(stmt))
+
+
+def _weak_query(columns, user_id: int, subject: str | None, limit: int | None, threshold):
+    threshold = settings.MASTERY_WEAK_THRESHOLD if threshold is None else threshold
+
+    stmt = (
+        select(*columns)
+        .where(
+            _mastery.user_id == user_id,
+            _mastery.total_attempts > 0,
+            # accuracy < threshold without dividing per row
+            _mastery.correct_attempts * 100.0 < _mastery.total_attempts * threshold
+        )
+        .order_by(
+            accuracy,
+            _mastery.total_attempts.desc(),
+            _mastery.concept
+        )
+        .limit(limit)
+    )
+    if subject is not None:
+        stmt = stmt.where(_mastery.subject == subject)
+    return stmt
+
+
+def weak_concepts(
+    db: Session,
+    user_id: int,
+    subject: str | None = None,
+    limit: int | None = None,
+    threshold: float | None = None
+) -> list[dict]:
+    """
+    Attempted concepts below the accuracy threshold (MASTERY_WEAK_THRESHOLD
+    by default), weakest first, then most attempted: subject, concept,
+    accuracy.
+    """
+    stmt = _weak_query(
+        (_mastery.subject, _mastery.concept, accuracy), user_id, subject, limit, threshold
+    )
+    return _rows(db.execute(stmt))
+
+
+def weak_concept_counts(
+    db: Session,
+    user_id: int,
+    subject: str | None = None,
+    limit: int | None = None,
+    threshold: float | None = None
+) -> list[tuple[str, int, int]]:
+    """
+    The weak_concepts rows as raw (concept, correct_attempts,
+    total_attempts), in the same order.
+    """
+    stmt = _weak_query(
+        (_mastery.concept, _mastery.correct_attempts, _mastery.total_attempts),
+        user_id, subject, limit, threshold
+    )
+    return [tuple(row) for row in db.execute(stmt)]
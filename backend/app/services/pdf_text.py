@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator
+
+from app.core.config import settings
+from app.utils.lazy import lazy_import
+from app.utils.processes import pool_context
+
+pypdf = lazy_import("pypdf")
+
+# kept free of torch/faiss imports: this module is what the extraction
+# worker processes import
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _extract_pages(pdf_path: str, start: int, stop: int) -> list[str]:
+    reader = pypdf.PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[str]:
+    """
+    Yield page texts in order. Large PDFs are split into page ranges that
+    are extracted in a process pool, with at most two ranges per worker in
+    flight so memory stays bounded regardless of page count.
+    """
+    page_count = len(pypdf.PdfReader(pdf_path).pages)
+    workers = settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+    step = settings.PDF_PAGES_PER_TASK
+
+    if workers <= 1 or page_count <= step:
+        yield from _extract_pages(pdf_path, 0, page_count)
+        return
+
+    pool = _get_pool(workers)
+    pending = deque()
+
+    for start in range(0, page_count, step):
+        pending.append(
+            pool.submit(_extract_pages, pdf_path, start, min(start + step, page_count))
+        )
+        if len(pending) >= workers * 2:
+            yield from pending.popleft().result()
+
+    while pending:
+        yield from pending.popleft().result()
+
+
+def extract_text_from_pdf(pdf_path: str) -> str:
+    return "".join(page + "\n" for page in iter_pdf_pages(pdf_path))
+
+
+def iter_chunks(pieces: Iterable[str], chunk_size=500, overlap=100) -> Iterator[str]:
+    """
+    Same chunks as chunk_text over the concatenated pieces, but only
+    holds about one chunk plus one piece in memory.
+    """
+    step = chunk_size - overlap
+    buffer = ""
+
+    for piece in pieces:
+        buffer += piece
+        while len(buffer) >= chunk_size:
+            yield buffer[:chunk_size]
+            buffer = buffer[step:]
+
+    while buffer:
+        yield buffer[:chunk_size]
+        buffer = buffer[step:]
+
+
+def iter_pdf_chunks(pdf_path: str, chunk_size=500, overlap=100) -> Iterator[str]:
+    pages = (page + "\n" for page in iter_pdf_pages(pdf_path))
+    return iter_chunks(pages, chunk_size, overlap)
+
+
+def chunk_text(text: str, chunk_size=500, overlap=100) -> list[str]:
+    return list(iter_chunks([text], chunk_size, overlap))
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
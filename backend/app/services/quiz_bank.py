@@ -0,0 +1,233 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.scheduler import PRIORITY_BACKGROUND, scheduler
+from app.services.quiz_generator import generate_mcq
+from app.utils.embeddings import embed_texts
+
+logger = logging.getLogger(__name__)
+
+
+class Topic:
+    def __init__(self, subject: str, topic: str, remember: int):
+        self.subject = subject
+        self.topic = topic
+        self.questions = deque()
+        # vectors of recently banked questions, served ones included
+        self.recent = deque(maxlen=remember)
+        # questions generated live for this topic, embedded into recent
+        # by the next refill
+        self.served = deque(maxlen=remember)
+        self.wanted = False  # below the low watermark, not yet back at high
+        self.requests = 0
+        self.filling = False
+        self.failures = 0  # consecutive generations that added nothing
+
+
+class QuizBank:
+    """
+    Pre-generated MCQs per (subject, topic).
+
+    take() pops a banked question, registering the topic on a miss. Once
+    a topic that has been asked for at least min_demand times (context is
+    free text, and most one-off topics would never be asked again) drops
+    below the low watermark, background workers top it up
+    to the high watermark through generate_mcq, but only while the LLM
+    scheduler is idle, so students' requests never queue behind them.
+    Questions whose embedding is too close to a recent one, banked or
+    generated live (see served()), are discarded.
+    """
+
+    def __init__(
+        self,
+        low: int,
+        high: int,
+        similarity: float,
+        max_topics: int,
+        workers: int,
+        idle_poll: float = 0.5,
+        max_failures: int = 3,
+        min_demand: int = 2,
+    ):
+        self.low = low
+        self.high = high
+        self.similarity = similarity
+        self.max_topics = max_topics
+        self.workers = workers
+        self.idle_poll = idle_poll
+        self.max_failures = max_failures
+        self.min_demand = min_demand
+
+        self._topics = OrderedDict()
+        self._wake = asyncio.Event()
+        self._tasks = []
+
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.failures = 0
+
+    @staticmethod
+    def key(subject: str, topic: str) -> tuple:
+        return (" ".join(subject.lower().split()), " ".join(topic.lower().split()))
+
+    def take(self, subject: str, topic: str) -> dict | None:
+        key = self.key(subject, topic)
+        entry = self._topics.get(key)
+
+        if entry is None:
+            entry = self._topics[key] = Topic(subject, topic, self.high * 4)
+            while len(self._topics) > self.max_topics:
+                self._topics.popitem(last=False)
+        self._topics.move_to_end(key)
+        entry.requests += 1
+
+        quiz = entry.questions.popleft() if entry.questions else None
+        if quiz is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        if (
+            len(entry.questions) < self.low
+            and not entry.wanted
+            and entry.requests >= self.min_demand
+        ):
+            entry.wanted = True
+            entry.failures = 0
+        if entry.wanted:
+            self._wake.set()
+
+        return quiz
+
+    def served(self, subject: str, topic: str, quiz: dict):
+        """
+        Remember a question generated live for a student on a bank miss,
+        so refills do not bank it and hand it out again.
+        """
+        entry = self._topics.get(self.key(subject, topic))
+        if entry is not None and quiz:
+            entry.served.append(quiz["question"])
+
+    def start(self):
+        if self._tasks or self.workers <= 0:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def _next_topic(self) -> Topic | None:
+        # emptiest first, so one popular topic does not starve the rest
+        candidates = [t for t in self._topics.values() if t.wanted and not t.filling]
+        return min(candidates, key=lambda t: len(t.questions), default=None)
+
+    async def _worker(self):
+        while True:
+            entry = self._next_topic()
+            if entry is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            entry.filling = True
+            try:
+                await self._fill_one(entry)
+            finally:
+                entry.filling = False
+
+    async def _wait_idle(self):
+        while not scheduler.idle:
+            await asyncio.sleep(self.idle_poll)
+
+    async def _fill_one(self, entry: Topic):
+        await self._wait_idle()
+
+        try:
+            # never coalesced with a live request for the same topic, which
+            # would bank the question that student is being shown
+            quiz = await generate_mcq(
+                entry.subject, entry.topic, priority=PRIORITY_BACKGROUND, coalesce=False
+            )
+            added = bool(quiz) and await self._add(entry, quiz)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(
+                "Quiz bank refill for %s / %s failed: %s", entry.subject, entry.topic, e
+            )
+            quiz, added = None, False
+            await asyncio.sleep(self.idle_poll)
+
+        if added:
+            entry.failures = 0
+            if len(entry.questions) >= self.high:
+                entry.wanted = False
+            return
+
+        if not quiz:
+            self.failures += 1
+        entry.failures += 1
+        if entry.failures >= self.max_failures:
+            # the model keeps failing or repeating itself on this topic;
+            # try again when the next take() finds it below the low mark
+            entry.wanted = False
+
+    async def _add(self, entry: Topic, quiz: dict) -> bool:
+        served = list(entry.served)
+        entry.served.clear()
+
+        vecs = await run_in_threadpool(embed_texts, served + [quiz["question"]])
+        vecs = np.asarray(vecs, dtype=np.float32)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        vecs = vecs / np.where(norms > 0, norms, 1)
+        entry.recent.extend(vecs[:-1])
+        vec = vecs[-1]
+
+        if entry.recent and float(np.max(np.stack(entry.recent) @ vec)) >= self.similarity:
+            self.duplicates += 1
+            return False
+
+        entry.recent.append(vec)
+        entry.questions.append(quiz)
+        self.generated += 1
+        return True
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "topics": len(self._topics),
+            "questions": sum(len(t.questions) for t in self._topics.values()),
+            "low": self.low,
+            "high": self.high,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "failures": self.failures,
+        }
+
+
+quiz_bank = QuizBank(
+    settings.QUIZ_BANK_LOW,
+    settings.QUIZ_BANK_HIGH,
+    settings.QUIZ_BANK_SIMILARITY,
+    settings.QUIZ_BANK_TOPICS,
+    settings.QUIZ_BANK_WORKERS,
+)
+metrics.register("quiz_bank", quiz_bank.stats)
@@ -1,23 +1,84 @@
-import json
-import re
+import asyncio
+from app.core.config import settings
 from app.core.llm import run_llm
+from app.core.scheduler import PRIORITY_QUIZ
+from app.utils.llm_json import find_json, iter_json
 
 
 def extract_json(text: str) -> dict:
     """
     Extract JSON object from LLM output safely
     """
-    match = re.search(r"\{[\s\S]*\}", text)
-    if not match:
-        return {}
+    return find_json(text, dict) or {}
 
-    try:
-        return json.loads(match.group())
-    except json.JSONDecodeError:
-        return {}
 
+def extract_json_list(text: str) -> list:
+    """
+    Extract a list of JSON objects from LLM output: a (possibly truncated)
+    array, an object wrapping one, or a lone object
+    """
+    for value in iter_json(text):
+        if isinstance(value, list):
+            items = [item for item in value if isinstance(item, dict)]
+            if items:
+                return items
+
+        elif isinstance(value, dict):
+            for nested in value.values():
+                if isinstance(nested, list) and any(isinstance(v, dict) for v in nested):
+                    return [item for item in nested if isinstance(item, dict)]
+            return [value]
+
+    return []
 
-def generate_mcq(subject: str, context: str) -> dict:
+
+MCQ_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "question": {"type": "string", "minLength": 1},
+        "options": {
+            "type": "array",
+            "items": {"type": "string", "minLength": 1},
+            "minItems": 4,
+            "maxItems": 4
+        },
+        "correct_answer": {"type": "string", "minLength": 1}
+    },
+    "required": ["question", "options", "correct_answer"],
+    "additionalProperties": False
+}
+
+
+def mcq_schema(n: int | None = None) -> dict | None:
+    """
+    JSON schema for one MCQ, or for an array of exactly n of them; None
+    when constrained decoding is switched off
+    """
+    if not settings.QUIZ_CONSTRAINED:
+        return None
+    if n is None:
+        return MCQ_SCHEMA
+    return {"type": "array", "items": MCQ_SCHEMA, "minItems": n, "maxItems": n}
+
+
+def validate_mcq(quiz) -> bool:
+    return (
+        isinstance(quiz, dict)
+        and "question" in quiz
+        and "options" in quiz
+        and "correct_answer" in quiz
+        and isinstance(quiz["options"], list)
+        and len(quiz["options"]) == 4
+    )
+
+
+async def generate_mcq(
+    subject: str,
+    context: str,
+    user_id=None,
+    priority: int = PRIORITY_QUIZ,
+    coalesce: bool = True
+) -> dict:
     prompt = f"""
 Generate ONE multiple choice question (MCQ).
 
@@ -38,20 +99,95 @@ Format:
 }}
 """
 
-    response = run_llm(prompt)
+    response = await run_llm(
+        prompt,
+        user_id=user_id,
+        priority=priority,
+        json_schema=mcq_schema(),
+        coalesce=coalesce
+    )
 
     quiz = extract_json(response)
 
     # final validation
-    if not quiz:
-        return {}
-
-    if (
-        "question" not in quiz
-        or "options" not in quiz
-        or "correct_answer" not in quiz
-        or len(quiz["options"]) != 4
-    ):
+    if not quiz or not validate_mcq(quiz):
         return {}
 
     return quiz
+
+
+async def _generate_mcq_set(
+    subject: str, context: str, n: int, part: int, parts: int, user_id, priority: int
+) -> list[dict]:
+    # the set number keeps parallel calls from being identical prompts,
+    # which would be coalesced into one generation of the same questions
+    set_line = f"Set {part} of {parts}; do not repeat questions from other sets.\n" if parts > 1 else ""
+
+    prompt = f"""
+Generate {n} different multiple choice questions (MCQs).
+
+Subject: {subject}
+Topic: {context}
+{set_line}
+Rules:
+- Exactly {n} questions, each on a different aspect of the topic
+- Exactly 4 options per question
+- One correct answer per question
+- No explanation
+- Output ONLY a valid JSON array
+
+Format:
+[
+  {{
+    "question": "...",
+    "options": ["A", "B", "C", "D"],
+    "correct_answer": "A"
+  }}
+]
+"""
+
+    response = await run_llm(
+        prompt,
+        user_id=user_id,
+        priority=priority,
+        max_tokens=n * settings.QUIZ_TOKENS_PER_QUESTION,
+        json_schema=mcq_schema(n)
+    )
+
+    return extract_json_list(response)
+
+
+async def generate_mcq_batch(
+    subject: str, context: str, n: int, user_id=None, priority: int = PRIORITY_QUIZ
+) -> list[dict]:
+    """
+    Up to n validated MCQs from as few generations as possible: one call
+    per QUIZ_PER_CALL questions, run concurrently. Invalid items, repeated
+    questions and failed calls are dropped, so fewer than n may come back.
+    """
+    per_call = max(1, settings.QUIZ_PER_CALL)
+    sizes = [min(per_call, n - start) for start in range(0, n, per_call)]
+
+    results = await asyncio.gather(*(
+        _generate_mcq_set(subject, context, size, i + 1, len(sizes), user_id, priority)
+        for i, size in enumerate(sizes)
+    ), return_exceptions=True)
+
+    # one failed set costs its questions, not the whole batch
+    sets = [r for r in results if not isinstance(r, BaseException)]
+    if not sets:
+        raise results[0]
+
+    quizzes, seen = [], set()
+    for quiz in (quiz for items in sets for quiz in items):
+        if not validate_mcq(quiz):
+            continue
+
+        question = " ".join(str(quiz["question"]).lower().split())
+        if question in seen:
+            continue
+
+        seen.add(question)
+        quizzes.append(quiz)
+
+    return quizzes[:n]
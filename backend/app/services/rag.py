@@ -1,61 +1,109 @@
+import hashlib
 import os
-import pickle
-from pypdf import PdfReader
-import faiss
-import numpy as np
 
+from app.core import metrics
+from app.core.config import settings
+from app.utils.cache import LRUCache
 from app.utils.embeddings import embed_texts
+from app.services.vector_store import vector_store
+from app.services.pdf_text import (
+    batched,
+    chunk_text,
+    extract_text_from_pdf,
+    iter_pdf_chunks,
+)
 
-VECTOR_PATH = "vector_store/pdf_vectors.pkl"
 
+_query_cache = LRUCache(settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL)
+metrics.register("query_embedding_cache", _query_cache.stats)
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    return text
 
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-def chunk_text(text: str, chunk_size=500, overlap=100) -> list[str]:
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    return chunks
 
+def document_key(path: str) -> str:
+    return os.path.normpath(path).replace(os.sep, "/")
 
-def store_pdf_vectors(chunks: list[str]):
-    os.makedirs(os.path.dirname(VECTOR_PATH), exist_ok=True)
 
-    embeddings = embed_texts(chunks)
-    dim = embeddings.shape[1]
+def store_pdf_vectors(writer, key: str, content_hash: str, chunks: list[str]):
+    embeddings = embed_texts(chunks) if chunks else None
+    writer.add(key, content_hash, chunks, embeddings)
 
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
 
-    with open(VECTOR_PATH, "wb") as f:
-        pickle.dump((index, chunks), f)
+def ingest_pdf(pdf_path: str, writer=None, lock_timeout: float | None = None) -> int:
+    """
+    Index one PDF unless the manifest already has it at the same content
+    hash. Returns the number of chunks embedded (0 when unchanged). Without
+    a writer, opens one, waiting at most lock_timeout seconds for the
+    store (vector_store.WriterBusy otherwise).
+    """
+    if writer is None:
+        with vector_store.writer(lock_timeout) as w:
+            return ingest_pdf(pdf_path, w)
 
+    key = document_key(pdf_path)
+    content_hash = file_sha256(pdf_path)
 
+    if writer.document_hash(key) == content_hash:
+        return 0
+
+    # register (or clear) the document even if it yields no text
+    writer.add(key, content_hash, [], None)
+
+    count = 0
+    for batch in batched(iter_pdf_chunks(pdf_path), settings.INGEST_BATCH_SIZE):
+        store_pdf_vectors(writer, key, content_hash, batch)
+        count += len(batch)
+    return count
+
+
+def normalize_query(query: str) -> str:
+    # MiniLM is uncased, so case and spacing do not change the embedding
+    return " ".join(query.lower().split())
 
-def search_pdf(query: str, k=1) -> list[str]:
-    if not os.path.exists(VECTOR_PATH):
-        return []
 
-    with open(VECTOR_PATH, "rb") as f:
-        index, chunks = pickle.load(f)
+def embed_query(query: str):
+    key = normalize_query(query)
+    query_vec = _query_cache.get(key)
+    if query_vec is None:
+        query_vec = embed_texts([key])
+        _query_cache.set(key, query_vec)
+    return query_vec
 
-    query_vec = embed_texts([query])
-    distances, indices = index.search(query_vec, k)
 
-    results = []
+def search_pdf_with_ids(query: str, k=1) -> tuple[str | None, list[int], list[str]]:
+    """
+    (index version, chunk ids, chunk texts) for the k nearest chunks.
+    """
+    snapshot = vector_store.get()
+    if snapshot is None:
+        return None, [], []
+
+    query_vec = embed_query(query)
+    distances, indices = snapshot.index.search(query_vec, k)
+
+    ids, results = [], []
     for i in indices[0]:
-        if i < len(chunks):
-            results.append(chunks[i][:200])  # 🔒 VERY IMPORTANT
+        if 0 <= i < len(snapshot.chunks):
+            ids.append(int(i))
+            results.append(snapshot.chunks[i][:200])  # 🔒 VERY IMPORTANT
+
+    return snapshot.version, ids, results
 
-    return results
+
+def search_pdf(query: str, k=1) -> list[str]:
+    return search_pdf_with_ids(query, k)[2]
 
 
+def warmup():
+    """
+    Load the vector store and the embedding model ahead of the first
+    chat request (see WARMUP_ON_STARTUP).
+    """
+    vector_store.load()
+    embed_texts(["warmup"])
@@ -0,0 +1,144 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import settings
+
+
+class ResponseCache:
+    """
+    Semantic cache of LLM answers.
+
+    Answers are grouped by an exact key (subject, retrieved chunk ids,
+    weak-concept set), i.e. everything that goes into the prompt besides
+    the question itself. Within a group a question is served the answer of
+    the most similar cached question if their cosine similarity is at
+    least the threshold. Bounded by entry count with LRU eviction, and
+    cleared whenever the PDF index version changes.
+    """
+
+    def __init__(self, maxsize: int, threshold: float, ttl: float = 0):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry id -> (key, vector, answer, expires)
+        self._groups = {}  # key -> [entry id]
+        self._ids = itertools.count()
+        self._index_version = None
+        # versions already replaced; requests that started on one of them
+        # must not bring it back
+        self._retired = deque(maxlen=32)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(subject: str, chunk_ids: list[int], weak_concepts: list[dict]) -> tuple:
+        return (
+            subject.lower(),
+            tuple(sorted(chunk_ids)),
+            frozenset(w["concept"] for w in weak_concepts),
+        )
+
+    def get(self, key: tuple, query_vec, index_version: str | None = None):
+        vec = _unit(query_vec)
+
+        with self._lock:
+            if not self._check_version(index_version):
+                self.misses += 1
+                return None
+
+            best_id, best_score = None, self.threshold
+            now = time.monotonic()
+            for entry_id in self._groups.get(key, ()):
+                _, cached_vec, _, expires = self._entries[entry_id]
+                if expires and expires <= now:
+                    continue
+                score = float(np.dot(cached_vec, vec))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][2]
+
+    def put(self, key: tuple, query_vec, answer: str, index_version: str | None = None):
+        vec = _unit(query_vec)
+        expires = time.monotonic() + self.ttl if self.ttl else 0
+
+        with self._lock:
+            # generated from an index that has been replaced meanwhile
+            if not self._check_version(index_version):
+                return
+
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (key, vec, answer, expires)
+            self._groups.setdefault(key, []).append(entry_id)
+
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def _check_version(self, index_version) -> bool:
+        """
+        False for a version that has already been replaced. A new one
+        drops every entry: answers may quote the old PDF chunks.
+        """
+        if index_version is None or index_version == self._index_version:
+            return True
+        if index_version in self._retired:
+            return False
+        if self._index_version is not None:
+            self._retired.append(self._index_version)
+            self._entries.clear()
+            self._groups.clear()
+            self.invalidations += 1
+        self._index_version = index_version
+        return True
+
+    def _drop(self, entry_id):
+        key = self._entries.pop(entry_id)[0]
+        group = self._groups[key]
+        group.remove(entry_id)
+        if not group:
+            del self._groups[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+def _unit(vec) -> np.ndarray:
+    vec = np.asarray(vec, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE_SIZE,
+    settings.RESPONSE_CACHE_THRESHOLD,
+    settings.RESPONSE_CACHE_TTL,
+)
+metrics.register("response_cache", response_cache.stats)
@@ -0,0 +1,429 @@
+import json
+import mmap
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import index_factory
+from app.utils.lazy import lazy_import
+
+faiss = lazy_import("faiss")
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.bin"
+OFFSETS_FILE = "chunks.off"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".write.lock"
+LEGACY_PICKLE = "pdf_vectors.pkl"
+LEGACY_DOCUMENT = "__legacy__"
+
+KEEP_VERSIONS = 2
+
+_UNLOADED = object()
+
+# an advisory lock on an open descriptor: the OS drops it when the holder
+# exits or crashes, so there is no stale lock to detect or take over
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock_fd(fd: int) -> bool:
+        os.lseek(fd, 0, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock_fd(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _try_lock_fd(fd: int) -> bool:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock_fd(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class WriterBusy(TimeoutError):
+    """
+    Another writer (an upload, ingest_pdfs.py) kept the store locked for
+    longer than the caller was willing to wait.
+    """
+
+
+class ChunkStore:
+    """
+    Read-only chunk text backed by two mmapped files:
+    chunks.bin (concatenated UTF-8) and chunks.off (int64 offsets, n + 1).
+    Every worker maps the same files, so the text lives in page cache once.
+    """
+
+    def __init__(self, directory: str):
+        self.offsets = np.memmap(
+            os.path.join(directory, OFFSETS_FILE), dtype=np.int64, mode="r"
+        )
+
+        with open(os.path.join(directory, CHUNKS_FILE), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # mmap refuses zero-length files
+            self._data = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            )
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self._data[start:end].decode("utf-8")
+
+
+def write_chunks(directory: str, chunks) -> int:
+    offsets = [0]
+
+    with open(os.path.join(directory, CHUNKS_FILE), "wb") as f:
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+
+    np.asarray(offsets, dtype=np.int64).tofile(
+        os.path.join(directory, OFFSETS_FILE)
+    )
+    return len(offsets) - 1
+
+
+class Snapshot(NamedTuple):
+    version: str
+    index: object  # faiss.Index
+    chunks: ChunkStore
+
+
+class VectorStoreWriter:
+    """
+    Incremental, append-only edit of the current version.
+
+    Documents are tracked in manifest.json by key with their content hash
+    and the id ranges of their chunks. Replacing a document removes its old
+    ids from the index; its old chunk text stays in chunks.bin unreferenced.
+    Removals are collected and applied once in write_to: an HNSW graph is
+    rebuilt to delete from it, and that should happen once per version,
+    not once per changed document.
+    """
+
+    def __init__(self, root: str, version: str | None):
+        self.root = root
+        self.base_version = version
+        self.base_directory = os.path.join(root, version) if version else None
+        self.dirty = False
+        self._added = set()
+        self._removed = []  # id arrays still present in self.index
+        # new chunk text is spooled to disk as it arrives, so a large
+        # ingest does not hold every chunk string until commit
+        self._spool = tempfile.TemporaryFile()
+        self._spool_lengths = []
+
+        if self.base_directory:
+            self.index = _as_id_map(
+                faiss.read_index(os.path.join(self.base_directory, INDEX_FILE))
+            )
+            self.manifest = _read_manifest(self.base_directory, self.index.ntotal)
+        else:
+            self.index = None
+            self.manifest = {"next_id": 0, "documents": {}}
+
+    @property
+    def documents(self) -> dict:
+        return self.manifest["documents"]
+
+    def document_hash(self, key: str) -> str | None:
+        doc = self.documents.get(key)
+        return doc["sha256"] if doc else None
+
+    def remove(self, key: str):
+        doc = self.documents.pop(key, None)
+        self._added.discard(key)
+        if not doc:
+            return
+
+        # ids are never reused, so the stale vectors can stay in the index
+        # until write_to without clashing with chunks added meanwhile
+        self._removed.extend(
+            np.arange(first, first + count, dtype=np.int64)
+            for first, count in doc["ranges"]
+        )
+        self.dirty = True
+
+    def add(self, key: str, content_hash: str, chunks: list[str], embeddings):
+        """
+        Add chunks for a document. The first call for a key in this writer
+        replaces any previous version of the document; later calls extend it.
+        """
+        if key not in self._added:
+            self.remove(key)
+            self.documents[key] = {"sha256": content_hash, "ranges": []}
+            self._added.add(key)
+
+        if not chunks:
+            self.dirty = True
+            return
+
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if self.index is None:
+            self.index = index_factory.create_index(embeddings.shape[1], embeddings)
+
+        first = self.manifest["next_id"]
+        ids = np.arange(first, first + len(chunks), dtype=np.int64)
+        self.index.add_with_ids(embeddings, ids)
+
+        ranges = self.documents[key]["ranges"]
+        if ranges and ranges[-1][0] + ranges[-1][1] == first:
+            ranges[-1][1] += len(chunks)
+        else:
+            ranges.append([first, len(chunks)])
+
+        self.manifest["next_id"] = first + len(chunks)
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            self._spool.write(data)
+            self._spool_lengths.append(len(data))
+        self.dirty = True
+
+    def write_to(self, directory: str):
+        if self._removed:
+            self.index = index_factory.remove_ids(self.index, np.concatenate(self._removed))
+            self._removed = []
+        self.index = index_factory.rebuild_if_needed(self.index)
+        faiss.write_index(self.index, os.path.join(directory, INDEX_FILE))
+
+        # chunk rows (= FAISS ids) stay stable: carry the previous chunks
+        # over and append the new ones after them
+        chunks_path = os.path.join(directory, CHUNKS_FILE)
+        if self.base_directory:
+            shutil.copyfile(os.path.join(self.base_directory, CHUNKS_FILE), chunks_path)
+            base_offsets = np.fromfile(
+                os.path.join(self.base_directory, OFFSETS_FILE), dtype=np.int64
+            )
+        else:
+            base_offsets = np.zeros(1, dtype=np.int64)
+
+        self._spool.seek(0)
+        with open(chunks_path, "ab") as f:
+            shutil.copyfileobj(self._spool, f)
+
+        new_offsets = base_offsets[-1] + np.cumsum(self._spool_lengths, dtype=np.int64)
+        np.concatenate([base_offsets, new_offsets]).tofile(
+            os.path.join(directory, OFFSETS_FILE)
+        )
+
+        with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+            json.dump(self.manifest, f)
+
+    def close(self):
+        self._spool.close()
+
+
+def _mmap_flags(path: str) -> int:
+    """
+    read_index flags that map the index file instead of copying it, so
+    every worker shares one copy in page cache. IO_FLAG_MMAP only covers
+    IVF inverted lists and IO_FLAG_MMAP_IFC only flat code storage (Flat,
+    and HNSW's vectors), and faiss rejects the two together.
+    """
+    with open(path, "rb") as f:
+        # IVF indexes' fourcc codes start with "Iw" (IwPQ, IwFl, ...)
+        ivf = f.read(2) == b"Iw"
+    mmap_flag = faiss.IO_FLAG_MMAP if ivf else faiss.IO_FLAG_MMAP_IFC
+    return mmap_flag | faiss.IO_FLAG_READ_ONLY
+
+
+def _as_id_map(index):
+    if isinstance(index, (faiss.IndexIDMap2, faiss.IndexIVF)):
+        return index_factory.prepare_for_writes(index)
+
+    # pre-manifest stores: plain index where the position is the chunk row
+    wrapped = faiss.IndexIDMap2(faiss.IndexFlatL2(index.d))
+    if index.ntotal:
+        wrapped.add_with_ids(
+            index.reconstruct_n(0, index.ntotal),
+            np.arange(index.ntotal, dtype=np.int64),
+        )
+    return wrapped
+
+
+def _read_manifest(directory: str, ntotal: int) -> dict:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        documents = {}
+        if ntotal:
+            documents[LEGACY_DOCUMENT] = {"sha256": None, "ranges": [[0, ntotal]]}
+        return {"next_id": ntotal, "documents": documents}
+
+
+class VectorStore:
+    """
+    Process-wide FAISS index + chunk store.
+
+    Each write lands in its own version directory and is published by
+    atomically replacing the CURRENT pointer file. Searches check the
+    pointer with a single stat and swap in the new snapshot as a whole,
+    so in-flight searches keep using the snapshot they started with.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._pointer = _UNLOADED
+
+    @property
+    def current_path(self):
+        return os.path.join(self.root, CURRENT_FILE)
+
+    def _pointer_stat(self):
+        try:
+            st = os.stat(self.current_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read_version(self):
+        try:
+            with open(self.current_path, "r") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        with self._lock:
+            legacy_path = os.path.join(self.root, LEGACY_PICKLE)
+            if self._read_version() is None and os.path.exists(legacy_path):
+                self._migrate_pickle(legacy_path)
+
+            pointer = self._pointer_stat()
+            version = self._read_version()
+
+            if version is None:
+                self._snapshot, self._pointer = None, pointer
+                return None
+
+            if self._snapshot is None or self._snapshot.version != version:
+                directory = os.path.join(self.root, version)
+                path = os.path.join(directory, INDEX_FILE)
+                index = faiss.read_index(path, _mmap_flags(path))
+                index_factory.configure_search(index)
+                self._snapshot = Snapshot(version, index, ChunkStore(directory))
+
+            self._pointer = pointer
+            return self._snapshot
+
+    def get(self):
+        if self._pointer_stat() != self._pointer:
+            return self.load()
+        return self._snapshot
+
+    @contextmanager
+    def writer(self, timeout: float | None = None):
+        """
+        Open the current version for incremental edits. The new version is
+        published when the block exits without error; writers in other
+        processes (uvicorn workers, ingest_pdfs.py) are serialized by an
+        OS lock on a lock file, held for as long as the block runs. Raises
+        WriterBusy if the lock is not free within timeout seconds (None
+        waits as long as it takes).
+        """
+        with self._write_lock(timeout):
+            writer = VectorStoreWriter(self.root, self._read_version())
+            try:
+                yield writer
+                if writer.dirty and writer.index is not None:
+                    self._publish(writer.write_to)
+            finally:
+                writer.close()
+
+    def _publish(self, write_to) -> str:
+        version = f"v{time.time_ns()}"
+        tmp_dir = os.path.join(self.root, f".{version}.tmp")
+        os.makedirs(tmp_dir)
+
+        write_to(tmp_dir)
+        os.replace(tmp_dir, os.path.join(self.root, version))
+
+        tmp_pointer = f"{self.current_path}.{os.getpid()}.tmp"
+        with open(tmp_pointer, "w") as f:
+            f.write(version)
+        os.replace(tmp_pointer, self.current_path)
+
+        self._prune(keep=version)
+        return version
+
+    @contextmanager
+    def _write_lock(self, timeout: float | None = None):
+        os.makedirs(self.root, exist_ok=True)
+        # the file itself is never removed: unlinking it while another
+        # writer waits on the old inode would let a third one in alongside
+        fd = os.open(os.path.join(self.root, LOCK_FILE), os.O_CREAT | os.O_RDWR)
+        try:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not _try_lock_fd(fd):
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise WriterBusy("The vector store is being updated by another writer")
+                time.sleep(0.1)
+            try:
+                yield
+            finally:
+                _unlock_fd(fd)
+        finally:
+            os.close(fd)
+
+    def _prune(self, keep: str):
+        versions = sorted(
+            (
+                name for name in os.listdir(self.root)
+                if name.startswith("v") and name != keep
+            ),
+            reverse=True,
+        )
+        # older versions may still be mapped by other workers; on Windows
+        # the delete fails until they reload, which is fine
+        for name in versions[KEEP_VERSIONS - 1:]:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def _migrate_pickle(self, legacy_path: str):
+        # every step under the lock: workers starting together race to
+        # migrate, and the losers find the pickle already renamed
+        with self._write_lock():
+            if not os.path.exists(legacy_path):
+                return
+
+            if self._read_version() is None:
+                with open(legacy_path, "rb") as f:
+                    index, chunks = pickle.load(f)
+
+                def write_to(directory):
+                    faiss.write_index(index, os.path.join(directory, INDEX_FILE))
+                    write_chunks(directory, chunks)
+
+                self._publish(write_to)
+            os.replace(legacy_path, legacy_path + ".migrated")
+
+
+vector_store = VectorStore(settings.VECTOR_STORE_DIR)
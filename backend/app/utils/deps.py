@@ -1,14 +1,42 @@
+import time
+from typing import NamedTuple
+
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
-from app.db.database import SessionLocal
+from app.core import metrics
+from app.core.config import settings
 from app.db import models
+from app.db.database import SessionLocal
+from app.utils.cache import LRUCache
 from app.utils.jwt import decode_token
 
 security = HTTPBearer()
 
 
+class Principal(NamedTuple):
+    """
+    The authenticated user as carried in the token claims. Routes only
+    need the id, so a resolved token is cached and most requests never
+    touch the users table.
+
+    Revocation goes through users.token_version, which every token
+    carries as its "ver" claim: invalidate_user bumps it, and a token
+    whose version no longer matches is rejected, as is one whose user is
+    gone. The check runs on a cache miss, so every worker enforces it
+    within AUTH_CACHE_TTL; the worker that revoked does at once.
+    """
+    id: int
+    email: str | None
+
+
+# token -> principal; entries never outlive the token
+_token_cache = LRUCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+metrics.register("auth_token_cache", _token_cache.stats)
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -17,25 +45,67 @@ def get_db():
         db.close()
 
 
-def get_current_user(
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+def _token_version(user_id: int) -> int | None:
+    with SessionLocal() as db:
+        return db.query(models.User.token_version).filter(
+            models.User.id == user_id
+        ).scalar()
+
+
+def _load_principal(token: str) -> Principal:
+    payload = decode_token(token)
+
+    try:
+        principal = Principal(int(payload["sub"]), payload.get("email"))
+        # tokens issued before versions existed are version 0
+        version = int(payload.get("ver", 0))
+    except (KeyError, TypeError, ValueError):
+        raise _unauthorized("Invalid token payload")
+
+    current = _token_version(principal.id)
+    if current is None:
+        raise _unauthorized("User not found")
+    if current != version:
+        raise _unauthorized("Token has been revoked")
+
+    ttl = min(settings.AUTH_CACHE_TTL, payload.get("exp", 0) - time.time())
+    if ttl > 0:
+        _token_cache.set(token, principal, ttl=ttl)
+
+    return principal
+
+
+def resolve_token(token: str) -> Principal:
+    principal = _token_cache.get(token)
+    if principal is not None:
+        return principal
+    return _load_principal(token)
+
+
+def invalidate_user(db: Session, user_id: int):
+    """
+    Revoke every token issued to the user so far, e.g. on a password
+    change, logout everywhere or deletion. Commits.
+    """
+    db.query(models.User).filter(models.User.id == user_id).update(
+        {models.User.token_version: models.User.token_version + 1},
+        synchronize_session=False,
+    )
+    db.commit()
+    _token_cache.pop_matching(lambda principal: principal.id == user_id)
+
+
+# async: the cached path is a dict lookup, not worth a threadpool hop;
+# a miss reads the user's token version, in the threadpool
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-):
+) -> Principal:
     token = credentials.credentials
-    payload = decode_token(token)
-    user_id = payload.get("sub")
-
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload"
-        )
-
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
-
-    return user
+    principal = _token_cache.get(token)
+    if principal is not None:
+        return principal
+    return await run_in_threadpool(_load_principal, token)
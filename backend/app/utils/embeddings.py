@@ -1,9 +1,110 @@
-from sentence_transformers import SentenceTransformer
+import threading
+import time
+from contextlib import contextmanager
+
 import numpy as np
 
-# lightweight, fast, offline
-model = SentenceTransformer("all-MiniLM-L6-v2")
+from app.core.config import settings
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Load the SentenceTransformer on first use. Importing this module no
+    longer pays for torch + model initialisation.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+
+                # lightweight, fast, offline
+                _model = SentenceTransformer(settings.EMBEDDING_MODEL)
+    return _model
+
+
+class EmbeddingEngine:
+    """
+    Batched encoder around the SentenceTransformer.
+
+    Texts are sorted by length before batching so each batch pads to a
+    similar length, then returned in the caller's order. Inside
+    multi_process() large calls are spread over a sentence-transformers
+    process pool (CPU-only hosts). Throughput is tracked for reporting.
+    """
+
+    def __init__(self, batch_size: int, processes: int):
+        self.batch_size = batch_size
+        self.processes = processes
+        self._pool = None
+        self._lock = threading.Lock()
+        self.texts = 0
+        self.seconds = 0.0
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        start = time.perf_counter()
+
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        ordered = [texts[i] for i in order]
+
+        if self._pool is not None and len(ordered) > self.batch_size:
+            vectors = self.model.encode_multi_process(
+                ordered,
+                self._pool,
+                batch_size=self.batch_size,
+                chunk_size=max(self.batch_size, -(-len(ordered) // self.processes)),
+            )
+        else:
+            vectors = self.model.encode(
+                ordered, batch_size=self.batch_size, convert_to_numpy=True
+            )
+
+        result = np.empty_like(vectors)
+        result[order] = vectors
+
+        with self._lock:
+            self.texts += len(texts)
+            self.seconds += time.perf_counter() - start
+
+        return result
+
+    @property
+    def model(self):
+        return get_model()
+
+    @contextmanager
+    def multi_process(self):
+        """
+        Run a process pool for the duration of the block when
+        EMBED_PROCESSES > 1. Meant for ingestion jobs, not the API.
+        """
+        if self.processes <= 1 or self._pool is not None:
+            yield self
+            return
+
+        self._pool = self.model.start_multi_process_pool(
+            target_devices=["cpu"] * self.processes
+        )
+        try:
+            yield self
+        finally:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "texts": self.texts,
+                "seconds": round(self.seconds, 3),
+                "texts_per_sec": round(self.texts / self.seconds, 1) if self.seconds else 0.0,
+            }
+
+
+engine = EmbeddingEngine(settings.EMBED_BATCH_SIZE, settings.EMBED_PROCESSES)
 
 
 def embed_texts(texts: list[str]) -> np.ndarray:
-    return model.encode(texts, convert_to_numpy=True)
+    return engine.encode(texts)
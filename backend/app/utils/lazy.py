@@ -0,0 +1,21 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a heavy module (faiss, pypdf, ...) that is only imported
+    on first attribute access, so importing app.main stays cheap.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
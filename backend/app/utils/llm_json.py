@@ -0,0 +1,177 @@
+import json
+
+_CLOSERS = {"{": "}", "[": "]"}
+_DELIMITERS = set(',:{}[]"\'') | set(" \t\r\n")
+_LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null",
+}
+# stop looking for a parseable value after this many opening brackets
+_MAX_STARTS = 32
+
+
+def _is_number(token: str) -> bool:
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return token.lower() not in ("nan", "inf", "-inf", "+inf", "infinity")
+
+
+def _ends_string(text: str, i: int) -> bool:
+    while i < len(text) and text[i] in " \t\r\n":
+        i += 1
+    return i == len(text) or text[i] in ",:}]"
+
+
+def _read_string(text: str, i: int) -> tuple[str | None, int]:
+    """
+    Read the string literal starting at text[i] (single or double quoted)
+    and return it re-encoded with double quotes, plus the index after it.
+    None if the text ends inside the string. A quote that is not followed
+    by a delimiter is taken as part of the text (What's, "ACID" inside a
+    question).
+    """
+    quote = text[i]
+    out = ['"']
+    i += 1
+    while i < len(text):
+        c = text[i]
+        if c == "\\":
+            if i + 1 == len(text):
+                return None, i
+            escaped = text[i + 1]
+            out.append("'" if quote == "'" and escaped == "'" else c + escaped)
+            i += 2
+            continue
+        if c == quote and _ends_string(text, i + 1):
+            out.append('"')
+            return "".join(out), i + 1
+        out.append('\\"' if c == '"' else c)
+        i += 1
+    return None, i
+
+
+def repair_json(text: str, start: int = 0) -> str | None:
+    """
+    Re-emit the object or array starting at text[start] as valid JSON
+    text, in one left-to-right pass.
+
+    Fixes what small models get wrong: trailing commas, single-quoted
+    strings, Python literals, bare words and mismatched closers. Text
+    after the value is ignored. If the text ends first (max_tokens), the
+    output is cut back to the last complete value and the open brackets
+    are closed, so the finished items of a partial array survive.
+    Returns None when nothing complete was found.
+    """
+    out = []
+    stack = []  # [opener, expecting_key]
+    safe = None  # (len(out), stack) after the last complete value
+    i = start
+
+    def mark_safe():
+        nonlocal safe
+        safe = (len(out), [opener for opener, _ in stack])
+
+    def strip_trailing():
+        while out and out[-1] in (",", " ", "\t", "\r", "\n"):
+            out.pop()
+
+    while i < len(text):
+        c = text[i]
+
+        if c in "\"'":
+            string, i = _read_string(text, i)
+            if string is None:
+                break
+            out.append(string)
+            if stack and stack[-1][0] == "{" and stack[-1][1]:
+                continue  # a key: the pair is not complete yet
+            mark_safe()
+
+        elif c in "{[":
+            stack.append([c, c == "{"])
+            out.append(c)
+            mark_safe()
+            i += 1
+
+        elif c in "}]":
+            i += 1
+            opener = "{" if c == "}" else "["
+            if not any(o == opener for o, _ in stack):
+                continue  # stray closer
+            strip_trailing()
+            while True:
+                o, _ = stack.pop()
+                out.append(_CLOSERS[o])
+                if o == opener:
+                    break
+            if not stack:
+                return "".join(out)
+            mark_safe()
+
+        elif c == ",":
+            out.append(c)
+            if stack[-1][0] == "{":
+                stack[-1][1] = True
+            i += 1
+
+        elif c == ":":
+            out.append(c)
+            stack[-1][1] = False
+            i += 1
+
+        elif c in " \t\r\n":
+            out.append(c)
+            i += 1
+
+        else:
+            j = i
+            while j < len(text) and text[j] not in _DELIMITERS:
+                j += 1
+            if j == len(text):
+                break  # the token may be cut short
+            token = text[i:j]
+            i = j
+
+            if token in _LITERALS:
+                out.append(_LITERALS[token])
+            elif _is_number(token):
+                out.append(token)
+            else:
+                # unquoted key or word, e.g. "correct_answer": C
+                out.append(json.dumps(token))
+            if not (stack[-1][0] == "{" and stack[-1][1]):
+                mark_safe()
+
+    # the text ended inside the value
+    if safe is None:
+        return None
+    length, openers = safe
+    del out[length:]
+    strip_trailing()
+    out.extend(_CLOSERS[o] for o in reversed(openers))
+    return "".join(out)
+
+
+def iter_json(text: str):
+    """
+    Parse (after repair) the object or array at each opening bracket of
+    text in turn, nested ones included, yielding those that parse.
+    """
+    starts = (i for i, c in enumerate(text) if c in "{[")
+    for _, start in zip(range(_MAX_STARTS), starts):
+        repaired = repair_json(text, start)
+        if repaired is None:
+            continue
+        try:
+            yield json.loads(repaired, strict=False)
+        except json.JSONDecodeError:
+            continue
+
+
+def find_json(text: str, types=(dict, list)):
+    """
+    The first object or array in text that parses into one of types, or None.
+    """
+    return next((v for v in iter_json(text) if isinstance(v, types)), None)
@@ -0,0 +1,13 @@
+import multiprocessing
+
+
+def pool_context():
+    """
+    Start method for the process pools the server creates lazily (Argon2,
+    PDF extraction). By then it is threaded and may have torch / OpenMP
+    loaded, and forking would copy locks other threads hold; forkserver
+    children fork from a clean single-threaded process instead (spawn
+    where that is missing).
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
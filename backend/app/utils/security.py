@@ -1,8 +1,26 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from passlib.context import CryptContext
 
+from app.core import metrics
+from app.core.config import settings
+from app.utils.processes import pool_context
+
+# hashes made with other parameters still verify, and needs_update()
+# flags them so login can rehash them
 pwd_context = CryptContext(
     schemes=["argon2"],
-    deprecated="auto"
+    deprecated="auto",
+    argon2__rounds=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM
 )
 
 
@@ -12,3 +30,140 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    (valid, new_hash): new_hash is set when the stored hash was made with
+    outdated Argon2 parameters and should replace it.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _lower_priority(nice: int):
+    # hashing workers yield the CPU to the API process when cores are short
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+class PasswordHasher:
+    """
+    Runs Argon2 off the request threadpool, in its own process pool.
+
+    At most `workers` hashes run at once; up to max_queue more wait for
+    a worker, beyond that callers get a 503 with Retry-After instead of
+    queueing. A login storm is then bounded by this pool and leaves the
+    threadpool and the event loop to everyone else; `nice` > 0 also runs
+    the workers at a lower CPU priority. A pool left broken by a dead
+    worker (e.g. OOM-killed) is replaced and the hash retried once.
+    workers=0 hashes in the threadpool, as before.
+    """
+
+    def __init__(self, workers: int, max_queue: int, nice: int = 0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.nice = nice
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._semaphore = None
+        self._waiting = 0
+
+        self.wait_time = metrics.LatencyStats()
+        self.hash_time = metrics.LatencyStats()
+        self.rejected = 0
+        self.pool_restarts = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=pool_context(),
+                    initializer=_lower_priority,
+                    initargs=(self.nice,)
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        with self._pool_lock:
+            # another caller may have replaced it already
+            if self._pool is pool:
+                self._pool = None
+                self.pool_restarts += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args):
+        if self.workers <= 0:
+            return await run_in_threadpool(fn, *args)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self.rejected += 1
+            service = self.hash_time.stats().get("mean_s", 1.0)
+            retry_after = max(1, round(service * self._waiting / self.workers))
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins right now. Please try again shortly.",
+                headers={"Retry-After": str(retry_after)}
+            )
+
+        queued = time.monotonic()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        try:
+            started = time.monotonic()
+            self.wait_time.observe(started - queued)
+            loop = asyncio.get_running_loop()
+            for attempt in range(2):
+                pool = self._get_pool()
+                try:
+                    result = await loop.run_in_executor(pool, fn, *args)
+                    break
+                except BrokenProcessPool:
+                    # every later submit to this pool would fail too
+                    self._discard_pool(pool)
+                    if attempt:
+                        raise
+            self.hash_time.observe(time.monotonic() - started)
+            return result
+        finally:
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await self._run(verify_and_update, plain_password, hashed_password)
+
+    async def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            # waiting for running hashes to finish blocks; keep it off the loop
+            await run_in_threadpool(pool.shutdown, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "waiting": self._waiting,
+            "rejected": self.rejected,
+            "pool_restarts": self.pool_restarts,
+            "wait_time": self.wait_time.stats(),
+            "hash_time": self.hash_time.stats(),
+        }
+
+
+hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_QUEUE,
+    settings.PASSWORD_HASH_NICE
+)
+metrics.register("password_hasher", hasher.stats)
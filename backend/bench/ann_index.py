@@ -0,0 +1,86 @@
+"""
+Recall / QPS / memory of the configured ANN index types against an exact
+Flat baseline on a synthetic, clustered corpus.
+
+    python -m bench.ann_index --n 200000 --queries 1000 --k 5
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services import index_factory
+
+
+def synthetic_corpus(n: int, dim: int, clusters: int, seed: int = 0):
+    # MiniLM embeddings are far from uniform; clustered gaussians are a
+    # closer stand-in than random noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run(index_type: str, corpus, queries, truth, k: int):
+    start = time.perf_counter()
+    index = index_factory.create_index(corpus.shape[1], corpus, index_type)
+    index.add_with_ids(corpus, np.arange(len(corpus), dtype=np.int64))
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    search_s = time.perf_counter() - start
+
+    return {
+        "type": index_factory.index_type_of(index),
+        "build_s": build_s,
+        "qps": len(queries) / search_s,
+        "recall": recall_at_k(found, truth),
+        "memory_mb": faiss.serialize_index(index).nbytes / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--types", default=",".join(index_factory.INDEX_TYPES))
+    args = parser.parse_args()
+
+    print(f"[+] Generating {args.n} x {args.dim} corpus")
+    corpus = synthetic_corpus(args.n + args.queries, args.dim, args.clusters)
+    corpus, queries = corpus[:args.n], corpus[args.n:]
+
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(corpus)
+    _, truth = exact.search(queries, args.k)
+
+    print(
+        f"    hnsw M={settings.VECTOR_HNSW_M} efSearch={settings.VECTOR_HNSW_EF_SEARCH}, "
+        f"ivfpq nlist={settings.VECTOR_IVF_NLIST} nprobe={settings.VECTOR_IVF_NPROBE} "
+        f"m={settings.VECTOR_PQ_M}"
+    )
+    print(f"{'index':<8}{'build s':>10}{'QPS':>12}{f'recall@{args.k}':>12}{'memory MB':>12}")
+
+    for index_type in args.types.split(","):
+        r = run(index_type, corpus, queries, truth, args.k)
+        print(
+            f"{r['type']:<8}{r['build_s']:>10.1f}{r['qps']:>12.0f}"
+            f"{r['recall']:>12.3f}{r['memory_mb']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Per-request cost of resolving the bearer token to a user: the old path
+(decode the JWT, then SELECT the user) versus deps.resolve_token, cold
+(decode + token_version lookup) and cached, on a scratch SQLite
+database. Also checks that invalidate_user revokes the user's tokens.
+
+    python -m bench.auth_overhead --requests 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import models
+from app.db.database import Base
+from app.utils import deps
+from app.utils.jwt import create_access_token, decode_token
+
+
+def legacy_current_user(token: str, db):
+    payload = decode_token(token)
+    return db.query(models.User).filter(models.User.id == int(payload["sub"])).first()
+
+
+def timed(fn, tokens: list[str]) -> float:
+    start = time.perf_counter()
+    for token in tokens:
+        fn(token)
+    return (time.perf_counter() - start) / len(tokens) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        # resolve_token reads token versions through the app's sessions
+        deps.SessionLocal.configure(bind=engine)
+
+        with Session() as db:
+            users = [
+                models.User(email=f"student{i}@example.com", hashed_password="x")
+                for i in range(args.users)
+            ]
+            db.add_all(users)
+            db.commit()
+
+            tokens = [
+                create_access_token({"sub": str(u.id), "email": u.email, "ver": u.token_version})
+                for u in users
+            ]
+            stream = [tokens[i % len(tokens)] for i in range(args.requests)]
+
+            legacy_us = timed(lambda t: legacy_current_user(t, db), stream)
+
+            deps._token_cache.clear()
+            cold_us = timed(deps.resolve_token, tokens)
+            cached_us = timed(deps.resolve_token, stream)
+
+            deps.invalidate_user(db, users[0].id)
+            try:
+                deps.resolve_token(tokens[0])
+                revoked = False
+            except HTTPException:
+                revoked = True
+
+        engine.dispose()
+
+    print(f"auth overhead per request ({args.requests} requests, {args.users} users)")
+    print(f"{'decode JWT + SELECT user':<28}{legacy_us:>10.1f} us")
+    print(f"{'resolve_token, cold':<28}{cold_us:>10.1f} us")
+    print(f"{'resolve_token, cached':<28}{cached_us:>10.1f} us")
+    print(f"cache: {deps._token_cache.stats()}")
+    print(f"invalidate_user revokes tokens: {'OK' if revoked else 'FAILED'}")
+    sys.exit(0 if revoked else 1)
+
+
+if __name__ == "__main__":
+    main()
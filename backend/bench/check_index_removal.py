@@ -0,0 +1,101 @@
+"""
+Removal check for every VECTOR_INDEX_TYPE: adds, replaces and removes
+documents through VectorStore.writer (the ingest path), and after each
+published version searches the read-only snapshot with every live chunk.
+Returned ids must all belong to live documents and each chunk must find
+itself in its top k. Exits non-zero otherwise.
+
+    python -m bench.check_index_removal --chunks 2000
+"""
+import argparse
+import sys
+import tempfile
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services import index_factory
+from app.services.vector_store import VectorStore
+
+
+def live_ids(manifest: dict) -> dict[int, str]:
+    return {
+        int(i): key
+        for key, doc in manifest["documents"].items()
+        for first, count in doc["ranges"]
+        for i in range(first, first + count)
+    }
+
+
+def check(index_type: str, args) -> bool:
+    settings.VECTOR_INDEX_TYPE = index_type
+    rng = np.random.default_rng(0)
+    vectors = {}
+
+    def document(key: str):
+        vectors[key] = rng.standard_normal((args.chunks, args.dim)).astype(np.float32)
+        faiss.normalize_L2(vectors[key])
+        return [f"{key} chunk {i}" for i in range(args.chunks)], vectors[key]
+
+    steps = [
+        ("add a", "a"), ("add b", "b"), ("replace a", "a"), ("remove b", None),
+        ("add c", "c"), ("remove a", None), ("add b", "b"), ("remove c", None),
+    ]
+
+    ok = True
+    with tempfile.TemporaryDirectory() as root:
+        store = VectorStore(root)
+        for label, key in steps:
+            with store.writer() as writer:
+                if key:
+                    chunks, embeddings = document(key)
+                    writer.add(key, label, chunks, embeddings)
+                else:
+                    writer.remove(label.split()[1])
+                manifest = writer.manifest
+
+            snapshot = store.get()
+            expected = live_ids(manifest)
+            ids = np.fromiter(expected, dtype=np.int64)
+            queries = np.concatenate([vectors[key] for key in dict.fromkeys(expected.values())])
+            _, found = snapshot.index.search(queries, args.k)
+
+            returned = set(found[found >= 0].tolist())
+            unknown = returned - set(expected)
+            recall = float(np.mean([i in row for i, row in zip(ids, found)]))
+            step_ok = not unknown and recall >= args.min_recall and snapshot.index.ntotal == len(ids)
+            ok = ok and step_ok
+
+            print(
+                f"  {label:<10} {index_factory.index_type_of(snapshot.index):<6}"
+                f" ntotal {snapshot.index.ntotal:>6} (expected {len(ids)})"
+                f"  recall@{args.k} {recall:.3f}  unknown ids {len(unknown)}"
+                f"  {'OK' if step_ok else 'FAILED'}"
+            )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    args = parser.parse_args()
+
+    # small enough to train on a single document
+    settings.VECTOR_IVF_NLIST = 16
+    settings.VECTOR_IVF_NPROBE = 16
+    settings.VECTOR_PQ_M = 16
+
+    ok = True
+    for index_type in index_factory.INDEX_TYPES:
+        print(index_type)
+        ok = check(index_type, args) and ok
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Concurrency check for quiz submit: many threads submit answers to the
+same quiz (so the same concept_mastery row) at once through the real
+submit_quiz handler, then the attempt and mastery counters must match
+exactly. Exits non-zero on any lost update or duplicate row.
+
+    python -m bench.check_mastery_counts --threads 16 --submits 50
+    python -m bench.check_mastery_counts --postgres-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.db import models
+from app.db.database import Base, create_db_engine
+from app.routes.quiz import submit_quiz
+from app.utils.deps import Principal
+
+
+def check(url: str, args) -> bool:
+    engine = create_db_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    with Session() as db:
+        db.add(models.User(email="student@example.com", hashed_password="x"))
+        db.flush()
+        quiz = models.Quiz(
+            user_id=1, subject="DBMS", question="Which normal form removes transitive dependencies?",
+            options='["1NF", "2NF", "3NF", "BCNF"]', correct_answer="3NF",
+        )
+        db.add(quiz)
+        db.commit()
+        quiz_id = quiz.id
+
+    barrier = threading.Barrier(args.threads)
+    errors = []
+
+    def submitter(n: int):
+        barrier.wait()
+        for i in range(args.submits):
+            with Session() as db:
+                try:
+                    submit_quiz(
+                        quiz_id=quiz_id,
+                        selected_answer="3NF" if (n + i) % 3 == 0 else "2NF",
+                        db=db,
+                        user=Principal(1, None),
+                    )
+                except Exception as e:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=submitter, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    expected_total = args.threads * args.submits
+    expected_correct = sum(
+        (n + i) % 3 == 0 for n in range(args.threads) for i in range(args.submits)
+    )
+
+    with Session() as db:
+        attempts = db.query(func.count(models.QuizAttempt.id)).scalar()
+        rows = db.query(models.ConceptMastery).all()
+    engine.dispose()
+
+    total = sum(r.total_attempts for r in rows)
+    correct = sum(r.correct_attempts for r in rows)
+    ok = (
+        not errors
+        and attempts == expected_total
+        and len(rows) == 1
+        and total == expected_total
+        and correct == expected_correct
+    )
+
+    print(f"{engine.dialect.name}: {args.threads} threads x {args.submits} submits")
+    print(f"  attempts rows     {attempts:>6} (expected {expected_total})")
+    print(f"  mastery rows      {len(rows):>6} (expected 1)")
+    print(f"  total_attempts    {total:>6} (expected {expected_total})")
+    print(f"  correct_attempts  {correct:>6} (expected {expected_correct})")
+    print(f"  errors            {len(errors):>6}" + (f" first: {errors[0]!r}" if errors else ""))
+    print(f"  {'OK' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--submits", type=int, default=50)
+    parser.add_argument("--postgres-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = check(f"sqlite:///{os.path.join(tmp, 'check.db')}", args)
+    if args.postgres_url:
+        ok = check(args.postgres_url, args) and ok
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
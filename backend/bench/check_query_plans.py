@@ -0,0 +1,130 @@
+"""
+Query-plan regression check for the hot per-user paths. Builds a scratch
+SQLite database twice, once through the Alembic migrations and once from
+the models, runs the real route/service functions against it, and
+EXPLAINs every SELECT / UPDATE / DELETE they issued. Exits non-zero if
+any plan step scans a table, covering index included: only SEARCH steps
+and temp B-trees for ORDER BY / GROUP BY pass.
+
+    python -m bench.check_query_plans
+"""
+import os
+import sys
+import tempfile
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db import models
+from app.db.database import Base
+from app.routes.chat import get_active_session
+from app.routes.progress import get_progress
+from app.routes.quiz import recommend_quiz, submit_quiz
+from app.routes.session import get_current_session
+from app.services.adaptive import get_weak_concepts, weak_concept_cache
+from app.utils.deps import Principal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def migrate(url: str):
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    # alembic/env.py takes the url from settings
+    previous, settings.DATABASE_URL = settings.DATABASE_URL, url
+    try:
+        command.upgrade(config, "head")
+    finally:
+        settings.DATABASE_URL = previous
+
+
+def seed(db):
+    db.add_all(models.User(email=f"s{i}@example.com", hashed_password="x") for i in range(3))
+    db.flush()
+    db.add_all(
+        models.LearningSession(user_id=1 + i % 3, subject="DBMS", is_active=int(i == 0))
+        for i in range(6)
+    )
+    db.add_all(
+        models.Quiz(
+            user_id=1 + i % 3, subject="DBMS", question=f"Q{i}?",
+            options='["A", "B", "C", "D"]', correct_answer="A",
+        )
+        for i in range(6)
+    )
+    db.commit()
+
+
+def exercise(db):
+    """
+    The queries behind chat, session lookup, quiz submit, recommendations
+    and progress.
+    """
+    user = Principal(1, None)
+    # a cached list would skip the weak-concept query
+    weak_concept_cache.store.clear()
+    get_active_session(db, user.id)
+    get_current_session(db=db, user=user)
+    submit_quiz(quiz_id=1, selected_answer="A", db=db, user=user)
+    submit_quiz(quiz_id=1, selected_answer="B", db=db, user=user)
+    get_weak_concepts(db=db, user_id=user.id, subject="DBMS")
+    recommend_quiz(limit=20, db=db, user=user)
+    get_progress(limit=None, offset=0, db=db, user=user)
+
+
+def full_scans(url: str) -> list[tuple[str, str]]:
+    engine = create_engine(url)
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb in ("SELECT", "UPDATE", "DELETE") and not statement.startswith("EXPLAIN"):
+            statements.append((statement, parameters))
+
+    with sessionmaker(bind=engine)() as db:
+        seed(db)
+        statements.clear()
+        exercise(db)
+
+    problems = []
+    with engine.connect() as conn:
+        for statement, parameters in dict.fromkeys(
+            (s, tuple(p) if isinstance(p, (list, tuple)) else p) for s, p in statements
+        ):
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            for row in plan:
+                detail = row[-1]
+                # "SCAN t USING COVERING INDEX" still reads every row
+                if detail.startswith("SCAN "):
+                    problems.append((" ".join(statement.split()), detail))
+    engine.dispose()
+    return problems
+
+
+def main():
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        migrated = f"sqlite:///{os.path.join(tmp, 'migrated.db')}"
+        migrate(migrated)
+
+        from_models = f"sqlite:///{os.path.join(tmp, 'models.db')}"
+        engine = create_engine(from_models)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+
+        for label, url in (("alembic head", migrated), ("models", from_models)):
+            problems = full_scans(url)
+            print(f"{label}: {'OK' if not problems else f'{len(problems)} full scan(s)'}")
+            for statement, detail in problems:
+                print(f"  {detail}\n    {statement}")
+            failed = failed or bool(problems)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
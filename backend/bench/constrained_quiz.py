@@ -0,0 +1,91 @@
+"""
+Quiz generation with and without the MCQ JSON schema (QUIZ_CONSTRAINED),
+against the stub llama server. Unconstrained answers are mangled at
+--defect-rate the way small models do (explanations running to
+max_tokens, truncated JSON, three options, prose); with a schema the stub
+returns exactly the schema's shape and stops when it closes, as
+llama-server's constrained sampling does.
+
+Each quiz is retried until it validates, as a student pressing
+"generate" again would. Words stand in for tokens.
+
+    python -m bench.constrained_quiz --quizzes 100 --defect-rate 0.3
+"""
+import argparse
+import asyncio
+import time
+
+from app.core import llm
+from app.core.config import settings
+from app.services.quiz_generator import generate_mcq, generate_mcq_batch
+from bench.stub_llama import StubServer
+
+
+async def run_mode(args, stub, constrained: bool) -> dict:
+    settings.QUIZ_CONSTRAINED = constrained
+    requests, tokens = stub.app.state.requests, stub.app.state.tokens
+
+    start = time.perf_counter()
+    valid = 0
+    for _ in range(args.quizzes):
+        for _ in range(args.max_attempts):
+            if await generate_mcq("DBMS", "normalization"):
+                valid += 1
+                break
+    single_s = time.perf_counter() - start
+
+    calls = stub.app.state.requests - requests
+    single_tokens = stub.app.state.tokens - tokens
+
+    batch = await generate_mcq_batch("DBMS", "normalization", 20)
+
+    return {
+        "calls": calls,
+        "retries": calls - valid,
+        "valid": valid,
+        "tokens": single_tokens / max(valid, 1),
+        "seconds": single_s,
+        "batch": len(batch),
+    }
+
+
+async def run(args):
+    with StubServer(
+        args.port,
+        latency=args.latency,
+        decode_delay=args.decode_delay,
+        defect_rate=args.defect_rate,
+    ) as stub:
+        llm.backends.reset([stub.url])
+        results = {
+            "unconstrained": await run_mode(args, stub, False),
+            "json_schema": await run_mode(args, stub, True),
+        }
+        await llm.close_client()
+
+    print(f"{args.quizzes} quizzes, defect rate {args.defect_rate:.0%} (synthetic stub)")
+    print(
+        f"{'mode':<16}{'calls':>7}{'retries':>9}{'valid':>7}"
+        f"{'tokens/quiz':>13}{'seconds':>9}{'batch of 20':>13}"
+    )
+    for mode, r in results.items():
+        print(
+            f"{mode:<16}{r['calls']:>7}{r['retries']:>9}{r['valid']:>7}"
+            f"{r['tokens']:>13.1f}{r['seconds']:>9.2f}{r['batch']:>13}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quizzes", type=int, default=100)
+    parser.add_argument("--defect-rate", type=float, default=0.3)
+    parser.add_argument("--max-attempts", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--decode-delay", type=float, default=0.001)
+    parser.add_argument("--port", type=int, default=8095)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
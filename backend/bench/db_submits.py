@@ -0,0 +1,139 @@
+"""
+Write-heavy load: threads calling the /quiz/submit handler back to back
+while other threads read progress, on the old engine (plain SQLite) and
+the tuned profiles from create_db_engine (SQLite WAL, and PostgreSQL
+when --postgres-url is given). Reports submits/sec, failed submits and
+reader latency.
+
+    python -m bench.db_submits --writers 8 --readers 4 --seconds 5
+    python -m bench.db_submits --postgres-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db import models
+from app.db.database import Base, create_db_engine
+from app.routes.progress import get_progress
+from app.routes.quiz import submit_quiz
+from app.utils.deps import Principal
+
+
+def seed(Session, users: int, quizzes: int) -> list[int]:
+    with Session() as db:
+        db.add_all(
+            models.User(email=f"student{i}@example.com", hashed_password="x")
+            for i in range(users)
+        )
+        rows = [
+            models.Quiz(
+                user_id=1 + i % users,
+                subject="DBMS",
+                question=f"Question {i}?",
+                options='["A", "B", "C", "D"]',
+                correct_answer="A",
+            )
+            for i in range(quizzes)
+        ]
+        db.add_all(rows)
+        db.flush()
+        ids = [(row.id, row.user_id) for row in rows]
+        db.commit()
+    return ids
+
+
+def run(engine, args) -> dict:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    quizzes = seed(Session, args.users, args.quizzes)
+
+    deadline = time.monotonic() + args.seconds
+    submits, failures, reads = [0] * args.writers, [0] * args.writers, []
+    lock = threading.Lock()
+
+    def writer(n: int):
+        i = n
+        while time.monotonic() < deadline:
+            quiz_id, user_id = quizzes[i % len(quizzes)]
+            i += args.writers
+            with Session() as db:
+                try:
+                    submit_quiz(
+                        quiz_id=quiz_id,
+                        selected_answer="AB"[i % 2],
+                        db=db,
+                        user=Principal(user_id, None),
+                    )
+                    submits[n] += 1
+                except OperationalError:
+                    db.rollback()
+                    failures[n] += 1
+
+    def reader(n: int):
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            with Session() as db:
+                get_progress(
+                    limit=None, offset=0, db=db, user=Principal(1 + n % args.users, None)
+                )
+            with lock:
+                reads.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    return {
+        "submits_per_s": sum(submits) / args.seconds,
+        "failed": sum(failures),
+        "read_p50_ms": np.percentile(reads, 50) * 1000 if reads else float("nan"),
+        "read_p99_ms": np.percentile(reads, 99) * 1000 if reads else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--quizzes", type=int, default=500)
+    parser.add_argument("--postgres-url")
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s per profile")
+    print(f"{'profile':<22}{'submits/s':>11}{'failed':>8}{'read p50':>11}{'read p99':>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        profiles = [
+            ("sqlite (old engine)", lambda: create_engine(
+                f"sqlite:///{os.path.join(tmp, 'old.db')}",
+                connect_args={"check_same_thread": False},
+            )),
+            ("sqlite WAL", lambda: create_db_engine(f"sqlite:///{os.path.join(tmp, 'wal.db')}")),
+        ]
+        if args.postgres_url:
+            profiles.append(("postgresql pool", lambda: create_db_engine(args.postgres_url)))
+
+        for label, make_engine in profiles:
+            r = run(make_engine(), args)
+            print(
+                f"{label:<22}{r['submits_per_s']:>11.1f}{r['failed']:>8}"
+                f"{r['read_p50_ms']:>9.1f}ms{r['read_p99_ms']:>9.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Wasted quiz generations with the old greedy-regex extractor versus the
+repairing extractor in app/utils/llm_json.py.
+
+The corpus is synthetic: MCQ answers rendered in the shapes phi-3 tends
+to produce (prose around the JSON, code fences, trailing commas, single
+quotes, unescaped quotes, bare answer letters, a second object, output
+cut off at max_tokens), not recorded model output. A generation counts
+as wasted when no valid MCQ can be recovered from it.
+
+    python -m bench.json_extract --samples 2000
+"""
+import argparse
+import json
+import random
+import re
+import time
+from collections import Counter
+
+from app.services.quiz_generator import extract_json, extract_json_list, validate_mcq
+
+TOPICS = ["normalization", "transactions", "indexing", "joins", "ACID", "B+ trees"]
+
+
+def legacy_extract_json(text: str) -> dict:
+    match = re.search(r"\{[\s\S]*\}", text)
+    if not match:
+        return {}
+    try:
+        return json.loads(match.group())
+    except json.JSONDecodeError:
+        return {}
+
+
+def legacy_extract_json_list(text: str) -> list:
+    match = re.search(r"\[[\s\S]*\]", text)
+    if match:
+        try:
+            items = json.loads(match.group())
+        except json.JSONDecodeError:
+            items = None
+        if isinstance(items, list):
+            return [item for item in items if isinstance(item, dict)]
+    item = legacy_extract_json(text)
+    return [item] if item else []
+
+
+def mcq(rng: random.Random) -> dict:
+    topic = rng.choice(TOPICS)
+    return {
+        "question": f"Which statement about {topic} is correct? (#{rng.randrange(1000)})",
+        "options": [f"Option {c} on {topic}" for c in "ABCD"],
+        "correct_answer": f"Option {rng.choice('ABCD')} on {topic}",
+    }
+
+
+def render(rng: random.Random, quiz: dict) -> str:
+    return json.dumps(quiz, indent=rng.choice([None, 2]))
+
+
+# single-question shapes: name -> fn(rng) -> text
+def clean(rng):
+    return render(rng, mcq(rng))
+
+
+def prose(rng):
+    return f"Sure! Here is your question:\n{render(rng, mcq(rng))}\nGood luck!"
+
+
+def fenced(rng):
+    return f"```json\n{render(rng, mcq(rng))}\n```"
+
+
+def trailing_braces(rng):
+    return render(rng, mcq(rng)) + "\n\nExplanation: the dependency {A} -> {B} is removed."
+
+
+def trailing_comma(rng):
+    return render(rng, mcq(rng)).replace('"\n}', '",\n}').replace('"}', '",}')
+
+
+def single_quotes(rng):
+    quiz = mcq(rng)
+    quiz["question"] = quiz["question"].replace("Which", "What's the")
+    items = ", ".join(f"'{o}'" for o in quiz["options"])
+    return (
+        f"{{'question': '{quiz['question']}', 'options': [{items}], "
+        f"'correct_answer': '{quiz['correct_answer']}'}}"
+    )
+
+
+def inner_quotes(rng):
+    quiz = mcq(rng)
+    text = render(rng, quiz)
+    return text.replace("statement about", 'statement about "the"', 1)
+
+
+def bare_letter(rng):
+    quiz = mcq(rng)
+    quiz["options"] = list("ABCD")
+    return render(rng, quiz).replace(
+        f'"correct_answer": "{quiz["correct_answer"]}"', "\"correct_answer\": C"
+    )
+
+
+def two_objects(rng):
+    return f"{render(rng, mcq(rng))}\n\n{render(rng, mcq(rng))}"
+
+
+def truncated(rng):
+    text = render(rng, mcq(rng))
+    return text[: rng.randrange(len(text) // 2, len(text) - 2)]
+
+
+SINGLE = {
+    "clean": (clean, 40),
+    "prose": (prose, 12),
+    "code fence": (fenced, 10),
+    "trailing braces": (trailing_braces, 6),
+    "trailing comma": (trailing_comma, 6),
+    "single quotes": (single_quotes, 5),
+    "unescaped quotes": (inner_quotes, 5),
+    "bare answer letter": (bare_letter, 4),
+    "two objects": (two_objects, 6),
+    "truncated": (truncated, 6),
+}
+
+
+# batch shapes (5 questions asked)
+def batch_clean(rng):
+    return json.dumps([mcq(rng) for _ in range(5)], indent=2)
+
+
+def batch_truncated(rng):
+    text = json.dumps([mcq(rng) for _ in range(5)], indent=2)
+    return text[: rng.randrange(len(text) // 3, len(text) - 2)]
+
+
+def batch_trailing_comma(rng):
+    return json.dumps([mcq(rng) for _ in range(5)], indent=2)[:-1] + ",\n]"
+
+
+def batch_wrapped(rng):
+    return json.dumps({"questions": [mcq(rng) for _ in range(5)]})
+
+
+def batch_prose(rng):
+    return batch_clean(rng) + "\n\nSee [1] for details on {normal forms}."
+
+
+BATCH = {
+    "clean": (batch_clean, 40),
+    "truncated at max_tokens": (batch_truncated, 25),
+    "trailing comma": (batch_trailing_comma, 10),
+    "wrapped in an object": (batch_wrapped, 10),
+    "prose after": (batch_prose, 15),
+}
+
+
+def corpus(shapes: dict, samples: int, rng: random.Random):
+    names = list(shapes)
+    weights = [shapes[n][1] for n in names]
+    for name in rng.choices(names, weights, k=samples):
+        yield name, shapes[name][0](rng)
+
+
+def single(args, rng):
+    wasted = {"legacy": Counter(), "repairing": Counter()}
+    totals = Counter()
+    seconds = Counter()
+
+    for name, text in corpus(SINGLE, args.samples, rng):
+        totals[name] += 1
+        for label, extract in (("legacy", legacy_extract_json), ("repairing", extract_json)):
+            start = time.perf_counter()
+            quiz = extract(text)
+            seconds[label] += time.perf_counter() - start
+            if not (quiz and validate_mcq(quiz)):
+                wasted[label][name] += 1
+
+    print(f"single-question generations ({args.samples}, synthetic)")
+    print(f"{'shape':<24}{'count':>7}{'wasted (legacy)':>18}{'wasted (repairing)':>21}")
+    for name in SINGLE:
+        print(f"{name:<24}{totals[name]:>7}{wasted['legacy'][name]:>18}{wasted['repairing'][name]:>21}")
+    for label in wasted:
+        n = sum(wasted[label].values())
+        print(
+            f"{label:<10} wasted {n:>5} ({n / args.samples:6.1%}), "
+            f"{seconds[label] / args.samples * 1e6:7.1f} us/extraction"
+        )
+
+
+def batch(args, rng):
+    items = {"legacy": Counter(), "repairing": Counter()}
+    wasted = Counter()
+    totals = Counter()
+
+    for name, text in corpus(BATCH, args.samples, rng):
+        totals[name] += 1
+        for label, extract in (
+            ("legacy", legacy_extract_json_list), ("repairing", extract_json_list)
+        ):
+            valid = sum(map(validate_mcq, extract(text)))
+            items[label][name] += valid
+            if not valid:
+                wasted[label] += 1
+
+    print(f"\nbatch generations of 5 ({args.samples}, synthetic): valid MCQs recovered")
+    print(f"{'shape':<26}{'asked':>7}{'legacy':>9}{'repairing':>11}")
+    for name in BATCH:
+        print(f"{name:<26}{totals[name] * 5:>7}{items['legacy'][name]:>9}{items['repairing'][name]:>11}")
+    for label in items:
+        print(
+            f"{label:<10} {sum(items[label].values()):>6} of {args.samples * 5} MCQs, "
+            f"{wasted[label]} generations wasted entirely"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    single(args, random.Random(args.seed))
+    batch(args, random.Random(args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Load balancing and failover of the LLM backend pool against several stub
+llama servers: one fast, one slow, one failing half its requests and one
+that is not running at all.
+
+    python -m bench.llm_failover --requests 300 --concurrency 16
+"""
+import argparse
+import asyncio
+import time
+
+from app.core import llm
+from app.core.scheduler import scheduler
+from bench.stub_llama import StubServer
+
+
+async def timed(prompt: str):
+    start = time.perf_counter()
+    try:
+        await llm.run_llm(prompt)
+        return time.perf_counter() - start, None
+    except Exception as e:
+        return time.perf_counter() - start, e
+
+
+async def run(args):
+    with StubServer(args.port, latency=0.2) as fast, \
+            StubServer(args.port + 1, latency=1.0) as slow, \
+            StubServer(args.port + 2, latency=0.2, fail_rate=0.5) as flaky:
+        dead = f"http://127.0.0.1:{args.port + 3}/v1/completions"
+        llm.backends.reset([fast.url, slow.url, flaky.url, dead])
+        llm.backends.health_interval = 1
+        llm.start_health_checks()
+        scheduler.max_in_flight = args.concurrency
+        scheduler.max_queue = scheduler.max_queue_per_user = args.requests
+
+        results = await asyncio.gather(
+            *(timed(f"q{i}") for i in range(args.requests))
+        )
+        stats = llm.backends.stats()
+        await llm.close_client()
+
+    latencies = sorted(t for t, e in results if e is None)
+    errors = [e for _, e in results if e is not None]
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent")
+    print(f"succeeded {len(latencies)}, failed {len(errors)}, retries {stats['retries']}")
+    if latencies:
+        print(f"latency p50 {latencies[len(latencies) // 2]:.2f}s, "
+              f"p95 {latencies[int(len(latencies) * 0.95)]:.2f}s")
+    print(f"{'backend':<44}{'requests':>10}{'errors':>8}{'healthy':>9}{'circuit':>9}")
+    for name, (url, b) in zip(("fast", "slow", "flaky", "dead"), stats["backends"].items()):
+        print(f"{name + ' ' + url:<44}{b['requests']:>10}{b['errors']:>8}"
+              f"{str(b['healthy']):>9}{'open' if b['circuit_open'] else 'closed':>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--port", type=int, default=8093)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
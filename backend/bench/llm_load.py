@@ -0,0 +1,89 @@
+"""
+Concurrent-request capacity of the async LLM client against a local stub
+llama server, compared with the old blocking requests.post path running
+on FastAPI's default 40-thread pool. While each burst runs, a trivial
+threadpool task (what every sync endpoint such as /auth/login needs) is
+timed to show whether the burst starves the rest of the API.
+
+    python -m bench.llm_load --requests 200 --latency 2.0
+"""
+import argparse
+import asyncio
+import time
+
+import anyio
+import requests
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import llm
+from app.core.config import settings
+from app.core.scheduler import scheduler
+from bench.stub_llama import StubServer
+
+
+def blocking_run_llm(url: str, prompt: str) -> str:
+    response = requests.post(url, json=llm.build_payload(prompt), timeout=60)
+    return response.json()["choices"][0]["text"]
+
+
+async def probe_threadpool(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await run_in_threadpool(lambda: None)
+        worst = max(worst, time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+    return worst
+
+
+async def fire(n: int, call) -> tuple[float, float]:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_threadpool(stop))
+    await asyncio.sleep(0.1)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(n)))
+    wall = time.perf_counter() - start
+
+    stop.set()
+    return wall, await probe
+
+
+async def run(args):
+    with StubServer(args.port, latency=args.latency) as stub:
+        llm.backends.reset([stub.url])
+        # measure the client itself, not the admission limits in front of it
+        scheduler.max_in_flight = args.requests
+
+        sync_s, sync_probe = await fire(
+            args.requests,
+            lambda i: run_in_threadpool(blocking_run_llm, stub.url, f"q{i}"),
+        )
+        sync_peak = stub.app.state.max_in_flight
+        stub.app.state.max_in_flight = 0
+
+        async_s, async_probe = await fire(args.requests, lambda i: llm.run_llm(f"q{i}"))
+        async_peak = stub.app.state.max_in_flight
+        await llm.close_client()
+
+    threads = anyio.to_thread.current_default_thread_limiter().total_tokens
+    print(f"{args.requests} requests, stub latency {args.latency}s")
+    print(f"{'client':<28}{'wall s':>10}{'req/s':>10}{'peak in-flight':>16}"
+          f"{'worst sync-endpoint wait s':>28}")
+    print(f"{f'requests + {threads} threads':<28}{sync_s:>10.1f}"
+          f"{args.requests / sync_s:>10.1f}{sync_peak:>16}{sync_probe:>28.2f}")
+    print(f"{f'httpx pool ({settings.LLM_MAX_CONNECTIONS} conns)':<28}{async_s:>10.1f}"
+          f"{args.requests / async_s:>10.1f}{async_peak:>16}{async_probe:>28.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=8091)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Login p99 and everyone else's p99 while a class logs in at once: a burst
+of concurrent POST /auth/login next to students polling a threadpool-bound
+endpoint (GET /session/current: token check, DB query), with Argon2 in
+the request threadpool (PASSWORD_HASH_WORKERS=0, the old behaviour) and
+in the hasher process pool. The API runs under uvicorn in a subprocess
+on a scratch SQLite database.
+
+    python -m bench.login_burst --logins 50 --students 10 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+PASSWORD = "correct horse battery"
+
+
+def seed(db_url: str, users: int):
+    from app.db import models
+    from app.db.database import Base
+    from app.utils.security import hash_password
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    hashed = hash_password(PASSWORD)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all(
+            models.User(email=f"student{i}@example.com", hashed_password=hashed)
+            for i in range(users)
+        )
+        db.commit()
+    engine.dispose()
+
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning"],
+        env={**os.environ, **env},
+    )
+    for _ in range(200):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("API did not start")
+
+
+def p(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+async def burst(base: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.logins + args.students)
+    async with httpx.AsyncClient(base_url=base, timeout=300, limits=limits) as client:
+        r = await client.post("/auth/login", json={"email": "student0@example.com", "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        logins, students, statuses = [], [], {}
+        done = asyncio.Event()
+
+        async def login(i: int):
+            start = time.perf_counter()
+            r = await client.post(
+                "/auth/login",
+                json={"email": f"student{i % args.users}@example.com", "password": PASSWORD},
+            )
+            logins.append(time.perf_counter() - start)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        async def student():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/session/current", headers=headers)
+                students.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        pollers = [asyncio.create_task(student()) for _ in range(args.students)]
+        await asyncio.sleep(0.5)
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*pollers)
+
+    return {"logins": logins, "students": students, "statuses": statuses, "elapsed": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--students", type=int, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8096)
+    args = parser.parse_args()
+
+    print(f"{args.logins} concurrent logins, {args.students} students polling, {os.cpu_count()} CPUs")
+    print(
+        f"{'hashing':<22}{'login p50':>11}{'login p99':>11}"
+        f"{'student p50':>13}{'student p99':>13}{'burst':>8}  statuses"
+    )
+
+    for label, workers in (("request threadpool", 0), (f"process pool ({args.workers})", args.workers)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            seed(db_url, args.users)
+            server = start_server(args.port, {
+                "DATABASE_URL": db_url,
+                "PASSWORD_HASH_WORKERS": str(workers),
+                "PASSWORD_HASH_QUEUE": str(args.logins),
+                "QUIZ_BANK_WORKERS": "0",
+                "LLM_HEALTH_INTERVAL": "0",
+            })
+            try:
+                r = asyncio.run(burst(f"http://127.0.0.1:{args.port}", args))
+            finally:
+                server.terminate()
+                server.wait()
+
+        print(
+            f"{label:<22}{p(r['logins'], 50):>9.0f}ms{p(r['logins'], 99):>9.0f}ms"
+            f"{p(r['students'], 50):>11.0f}ms{p(r['students'], 99):>11.0f}ms"
+            f"{r['elapsed']:>7.1f}s  {r['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Latency of the per-chat weak-concept lookup and of the progress/recommend
+reads as a user's concept count grows: the old load-every-row Python
+loops versus app/services/mastery.py, on a scratch SQLite database.
+
+    python -m bench.mastery_queries --sizes 10 100 1000 10000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db import models
+from app.db.database import Base, create_db_engine
+from app.services import mastery
+
+
+def legacy_weak_concepts(db, user_id: int, subject: str):
+    records = db.query(models.ConceptMastery).filter_by(user_id=user_id, subject=subject).all()
+    weak = []
+    for r in records:
+        if r.total_attempts > 0:
+            accuracy = (r.correct_attempts / r.total_attempts) * 100
+            if accuracy < 60:
+                weak.append({"concept": r.concept, "accuracy": round(accuracy, 2)})
+    return weak
+
+
+def legacy_recommend(db, user_id: int):
+    weak = db.query(models.ConceptMastery).filter(
+        models.ConceptMastery.user_id == user_id,
+        models.ConceptMastery.total_attempts > 0
+    ).all()
+    return [
+        {"subject": w.subject, "concept": w.concept,
+         "accuracy": round(w.correct_attempts / w.total_attempts * 100, 2)}
+        for w in weak if w.correct_attempts / w.total_attempts * 100 < 60
+    ]
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'concepts':>9}{'weak (old)':>13}{'weak (sql)':>13}{'recommend (old)':>18}{'recommend (sql)':>18}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            engine = create_db_engine(f"sqlite:///{os.path.join(tmp, f'm{size}.db')}")
+            Base.metadata.create_all(engine)
+            Session = sessionmaker(bind=engine)
+
+            with Session() as db:
+                rows = []
+                for i in range(size):
+                    total = rng.randint(0, 20)
+                    rows.append(dict(
+                        user_id=1, subject="DBMS", concept=f"concept {i}",
+                        correct_attempts=rng.randint(0, total), total_attempts=total,
+                    ))
+                db.bulk_insert_mappings(models.ConceptMastery, rows)
+                db.commit()
+
+                results = [
+                    timed(lambda: legacy_weak_concepts(db, 1, "DBMS"), args.repeat),
+                    timed(
+                        lambda: mastery.weak_concepts(
+                            db, 1, subject="DBMS", limit=settings.WEAK_CONCEPTS_LIMIT
+                        ),
+                        args.repeat,
+                    ),
+                    timed(lambda: legacy_recommend(db, 1), args.repeat),
+                    timed(lambda: mastery.weak_concepts(db, 1, limit=20), args.repeat),
+                ]
+            engine.dispose()
+
+            old_weak, sql_weak, old_recommend, sql_recommend = results
+            print(
+                f"{size:>9}{old_weak:>11.2f}ms{sql_weak:>11.2f}ms"
+                f"{old_recommend:>16.2f}ms{sql_recommend:>16.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
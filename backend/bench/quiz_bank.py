@@ -0,0 +1,161 @@
+"""
+Students asking /quiz/generate for a handful of topics, with and without
+the background quiz bank, against the stub llama server. Reports bank
+hit rate, latency of hits and misses, LLM calls, banked questions that a
+student of the same topic had already been shown (a refill coalesced
+with a live request used to bank the live question), and questions still
+banked at the end, mostly for one-off topics (--one-off of the requests
+name a topic nobody asks for again).
+
+Embeddings are a stand-in seeded from the question text, so the bench
+needs no model download: identical questions are duplicates, any two
+different ones are not.
+
+    python -m bench.quiz_bank --students 20 --requests 10 --topics 4 --one-off 0.3
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import tempfile
+import time
+from contextvars import ContextVar
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import llm
+from app.db import models
+from app.db.database import Base
+from app.routes.quiz import generate_quiz
+from app.services import quiz_bank as quiz_bank_module
+from app.services.quiz_bank import quiz_bank
+from app.utils.deps import Principal
+from bench.stub_llama import StubServer
+
+
+# whether the current student's last take() was a hit
+_bank_hit = ContextVar("bank_hit", default=False)
+
+
+def text_embeddings(texts: list[str]) -> np.ndarray:
+    return np.stack([
+        np.random.default_rng(
+            int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        ).standard_normal(32)
+        for text in texts
+    ]).astype(np.float32)
+
+
+async def run(args, banked: bool, Session, stub) -> dict:
+    quiz_bank._topics.clear()
+    quiz_bank.hits = quiz_bank.misses = quiz_bank.generated = quiz_bank.duplicates = 0
+    if banked:
+        quiz_bank.start()
+
+    topics = [f"topic {i}" for i in range(args.topics)]
+    shown = {topic: set() for topic in topics}
+    repeats = 0
+    latencies = {"hit": [], "miss": []}
+    rng = random.Random(0)
+
+    async def student(n: int):
+        nonlocal repeats
+        with Session() as db:
+            for _ in range(args.requests):
+                await asyncio.sleep(rng.expovariate(1 / args.think))
+                if rng.random() < args.one_off:
+                    topic = f"one-off {rng.random()}"
+                    shown[topic] = set()
+                else:
+                    topic = rng.choice(topics)
+                start = time.perf_counter()
+                result = await generate_quiz(
+                    subject="DBMS", context=topic, db=db, user=Principal(1 + n, None)
+                )
+                hit = _bank_hit.get()
+                latencies["hit" if hit else "miss"].append(time.perf_counter() - start)
+                if "question" in result:
+                    repeats += hit and result["question"] in shown[topic]
+                    shown[topic].add(result["question"])
+
+    calls = stub.app.state.requests
+    saved = llm.inflight.coalesced
+    await asyncio.gather(*(student(n) for n in range(args.students)))
+    await quiz_bank.stop()
+    unserved = quiz_bank.stats()["questions"]
+
+    requests = sum(len(v) for v in latencies.values())
+    return {
+        "hit_rate": len(latencies["hit"]) / requests,
+        "hit_ms": np.median(latencies["hit"]) * 1000 if latencies["hit"] else float("nan"),
+        "miss_ms": np.median(latencies["miss"]) * 1000 if latencies["miss"] else float("nan"),
+        "calls": stub.app.state.requests - calls,
+        "coalesced": llm.inflight.coalesced - saved,
+        "repeats": repeats,
+        "unserved": unserved,
+    }
+
+
+async def main_async(args):
+    quiz_bank_module.embed_texts = text_embeddings
+    take = quiz_bank.take
+
+    def recording_take(subject: str, topic: str):
+        quiz = take(subject, topic)
+        _bank_hit.set(quiz is not None)
+        return quiz
+
+    quiz_bank.take = recording_take
+    quiz_bank.idle_poll = 0.05
+
+    with tempfile.TemporaryDirectory() as tmp, StubServer(
+        args.port, latency=args.latency, decode_delay=0
+    ) as stub:
+        llm.backends.reset([stub.url])
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bank.db')}",
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            db.add_all(
+                models.User(email=f"student{i}@example.com", hashed_password="x")
+                for i in range(args.students)
+            )
+            db.commit()
+
+        print(f"{args.students} students x {args.requests} requests over {args.topics} topics, "
+              f"{args.one_off:.0%} one-off topics")
+        print(f"{'':<10}{'hit rate':>10}{'hit p50':>11}{'miss p50':>11}"
+              f"{'LLM calls':>11}{'coalesced':>11}{'bank repeats':>14}{'unserved':>10}")
+        for label, banked in (("no bank", False), ("bank", True)):
+            r = await run(args, banked, Session, stub)
+            print(
+                f"{label:<10}{r['hit_rate']:>10.2f}{r['hit_ms']:>9.1f}ms{r['miss_ms']:>9.1f}ms"
+                f"{r['calls']:>11}{r['coalesced']:>11}{r['repeats']:>14}{r['unserved']:>10}"
+            )
+
+        engine.dispose()
+        await llm.close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--topics", type=int, default=4)
+    parser.add_argument("--one-off", type=float, default=0.3)
+    parser.add_argument("--think", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--port", type=int, default=8097)
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
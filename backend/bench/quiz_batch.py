@@ -0,0 +1,97 @@
+"""
+A practice set of N questions generated one MCQ per call (the /quiz/generate
+path, serially) versus generate_mcq_batch, against the stub llama server,
+plus N single-row commits versus one bulk insert into a scratch SQLite db.
+
+The stub charges a fixed per-request latency (prompt processing, HTTP)
+plus --decode-delay per generated word, so the numbers show the saved
+round trips, not real phi-3 throughput.
+
+    python -m bench.quiz_batch --n 10 --latency 0.5 --decode-delay 0.01
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import llm
+from app.core.config import settings
+from app.core.scheduler import scheduler
+from app.db import models
+from app.db.database import Base
+from app.routes.quiz import save_quiz, save_quizzes
+from app.services.quiz_generator import generate_mcq, generate_mcq_batch
+from bench.stub_llama import StubServer
+
+
+async def generate(args):
+    with StubServer(
+        args.port, latency=args.latency, decode_delay=args.decode_delay
+    ) as stub:
+        llm.backends.reset([stub.url])
+        scheduler.max_in_flight = max(scheduler.max_in_flight, args.n)
+
+        start = time.perf_counter()
+        serial = [await generate_mcq("DBMS", "normalization") for _ in range(args.n)]
+        serial_s = time.perf_counter() - start
+        serial_calls = stub.app.state.requests
+
+        start = time.perf_counter()
+        batch = await generate_mcq_batch("DBMS", "normalization", args.n)
+        batch_s = time.perf_counter() - start
+        batch_calls = stub.app.state.requests - serial_calls
+
+        await llm.close_client()
+
+    print(f"generation of {args.n} MCQs (QUIZ_PER_CALL={settings.QUIZ_PER_CALL})")
+    print(f"{'':<20}{'calls':>8}{'valid':>8}{'seconds':>10}")
+    print(f"{'one per call':<20}{serial_calls:>8}{sum(map(bool, serial)):>8}{serial_s:>10.2f}")
+    print(f"{'batch':<20}{batch_calls:>8}{len(batch):>8}{batch_s:>10.2f}")
+    return batch
+
+
+def insert(quizzes: list[dict], rounds: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as db:
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for quiz_data in quizzes:
+                    save_quiz(db, 1, "DBMS", quiz_data)
+            single_s = (time.perf_counter() - start) / rounds
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                save_quizzes(db, 1, "DBMS", quizzes)
+            bulk_s = (time.perf_counter() - start) / rounds
+
+            rows = db.query(models.Quiz).count()
+        engine.dispose()
+
+    print(f"\ninsert of {len(quizzes)} quizzes (mean of {rounds} rounds, {rows} rows written)")
+    print(f"{'commit per quiz':<20}{single_s * 1000:>10.2f} ms")
+    print(f"{'one bulk commit':<20}{bulk_s * 1000:>10.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--decode-delay", type=float, default=0.01)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8094)
+    args = parser.parse_args()
+
+    quizzes = asyncio.run(generate(args))
+    insert(quizzes, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Time-to-first-token of the streaming LLM path versus waiting for the full
+completion, against the stub llama server, and a check that abandoning a
+stream cancels the upstream generation.
+
+    python -m bench.stream_latency --token-delay 0.1
+"""
+import argparse
+import asyncio
+import time
+
+from app.core import llm
+from bench.stub_llama import ANSWER, StubServer
+
+
+async def run(args):
+    # the blocking reply takes as long as generating every token
+    latency = args.token_delay * len(ANSWER.split())
+
+    with StubServer(args.port, latency=latency, token_delay=args.token_delay) as stub:
+        llm.backends.reset([stub.url])
+
+        start = time.perf_counter()
+        await llm.run_llm("q")
+        full_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        first_s = None
+        async for _ in llm.stream_llm("q"):
+            if first_s is None:
+                first_s = time.perf_counter() - start
+        stream_s = time.perf_counter() - start
+
+        tokens = llm.stream_llm("q")
+        async for _ in tokens:
+            break
+        await tokens.aclose()
+        await asyncio.sleep(args.token_delay * 3)
+        await llm.close_client()
+
+        print(f"{'full completion (blocking)':<30}{full_s:>8.2f}s")
+        print(f"{'stream: first token':<30}{first_s:>8.2f}s")
+        print(f"{'stream: last token':<30}{stream_s:>8.2f}s")
+        print(f"abandoned streams cancelled upstream: {stub.app.state.cancelled}/1")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--token-delay", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=8092)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Minimal stand-in for llama.cpp's server: answers /v1/completions after a
+fixed latency, optionally failing a fraction of requests. With
+"stream": true it emits one SSE chunk per word every --token-delay
+seconds and counts streams the client abandoned. Prompts asking for
+multiple choice questions get that many questions back as JSON, with
+--defect-rate of them mangled the way unconstrained small models do,
+unless the request carries a json_schema, which the answer then matches.
+--decode-delay adds a per-word cost to non-streamed answers.
+
+    python -m bench.stub_llama --port 8081 --latency 2.0 --fail-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = "Normalization organises tables to reduce redundancy. " * 4
+
+
+def mcq(i: int) -> dict:
+    return {
+        "question": f"Which normal form removes transitive dependency #{i}?",
+        "options": ["1NF", "2NF", "3NF", "BCNF"],
+        "correct_answer": "3NF",
+    }
+
+
+def mcq_count(prompt: str) -> int | None:
+    match = re.search(r"Generate (ONE|\d+) (?:different )?multiple choice", prompt)
+    if not match:
+        return None
+    return 1 if match.group(1) == "ONE" else int(match.group(1))
+
+
+def answer_for(prompt: str) -> str:
+    count = mcq_count(prompt)
+    if count is None:
+        return ANSWER
+    if "Generate ONE" in prompt:
+        return json.dumps(mcq(random.randrange(10**6)))
+    return json.dumps([mcq(random.randrange(10**6)) for _ in range(count)])
+
+
+def with_defect(text: str) -> str:
+    """
+    What an unconstrained small model does to a JSON answer now and then.
+    """
+    defect = random.choices(
+        ["explanation", "preamble", "three options", "prose"], [50, 20, 15, 15]
+    )[0]
+    if defect == "explanation":
+        # keeps going after the object closes, until max_tokens
+        return text + "\n\nExplanation: " + "Third normal form removes transitive dependencies. " * 40
+    if defect == "preamble":
+        # thinks out loud first and runs out of tokens inside the JSON
+        return "Let me think about this step by step. " * 30 + text
+    if defect == "three options":
+        value = json.loads(text)
+        for quiz in value if isinstance(value, list) else [value]:
+            quiz["options"] = quiz["options"][:3]
+        return json.dumps(value)
+    return "Sure! Here is your question:\n" + text
+
+
+def sample_schema(schema: dict):
+    """
+    A value matching schema, the way a grammar-constrained model would
+    produce one. MCQ-shaped objects get MCQ content.
+    """
+    kind = schema.get("type")
+    if kind == "array":
+        return [sample_schema(schema["items"]) for _ in range(schema.get("minItems", 1))]
+    if kind == "object":
+        properties = schema.get("properties", {})
+        if set(properties) == {"question", "options", "correct_answer"}:
+            return mcq(random.randrange(10**6))
+        return {key: sample_schema(sub) for key, sub in properties.items()}
+    if kind == "string":
+        return "text"
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "boolean":
+        return False
+    raise ValueError(f"unsupported schema type: {kind!r}")
+
+
+def conforms(value, schema: dict) -> bool:
+    kind = schema.get("type")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return (
+            isinstance(value, dict)
+            and all(key in value for key in schema.get("required", []))
+            and (schema.get("additionalProperties", True) or set(value) <= set(properties))
+            and all(conforms(value[k], sub) for k, sub in properties.items() if k in value)
+        )
+    if kind == "array":
+        return (
+            isinstance(value, list)
+            and schema.get("minItems", 0) <= len(value) <= schema.get("maxItems", len(value))
+            and all(conforms(item, schema.get("items", {})) for item in value)
+        )
+    if kind == "string":
+        return isinstance(value, str) and len(value) >= schema.get("minLength", 0)
+    return True
+
+
+def generate(payload: dict, defect_rate: float) -> str:
+    """
+    Completion text for payload, cut at n_predict words (words stand in
+    for tokens). A json_schema is honoured exactly; GBNF grammars are not
+    parsed, only taken to mean well-formed output.
+    """
+    prompt = payload.get("prompt", "")
+    schema = payload.get("json_schema")
+
+    if schema is not None:
+        value = sample_schema(schema)
+        assert conforms(value, schema)
+        text = json.dumps(value)
+    else:
+        text = answer_for(prompt)
+        constrained = payload.get("grammar") is not None
+        if mcq_count(prompt) and not constrained and random.random() < defect_rate:
+            text = with_defect(text)
+
+    words = text.split(" ")
+    limit = payload.get("n_predict") or payload.get("max_tokens") or len(words)
+    return " ".join(words[:limit])
+
+
+def create_app(
+    latency: float = 1.0,
+    fail_rate: float = 0.0,
+    token_delay: float = 0.05,
+    decode_delay: float = 0.0,
+    defect_rate: float = 0.0,
+) -> FastAPI:
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.tokens = 0
+    app.state.in_flight = 0
+    app.state.max_in_flight = 0
+    app.state.cancelled = 0
+
+    async def stream(words: list[str]):
+        sent = 0
+        try:
+            for word in words:
+                await asyncio.sleep(token_delay)
+                yield f"data: {json.dumps({'choices': [{'text': word + ' '}]})}\n\n"
+                sent += 1
+            yield "data: [DONE]\n\n"
+        finally:
+            if sent < len(words):
+                app.state.cancelled += 1
+            app.state.in_flight -= 1
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        payload = await request.json()
+        app.state.requests += 1
+        app.state.in_flight += 1
+        app.state.max_in_flight = max(app.state.max_in_flight, app.state.in_flight)
+
+        if payload.get("stream"):
+            return StreamingResponse(stream(ANSWER.split()), media_type="text/event-stream")
+
+        try:
+            try:
+                text = generate(payload, defect_rate)
+            except (ValueError, KeyError, AttributeError) as e:
+                return JSONResponse({"error": f"failed to parse grammar: {e}"}, status_code=400)
+
+            tokens = len(text.split())
+            app.state.tokens += tokens
+            await asyncio.sleep(latency + decode_delay * tokens)
+            if random.random() < fail_rate:
+                return JSONResponse({"error": "injected failure"}, status_code=500)
+            return {"choices": [{"text": text}], "usage": {"completion_tokens": tokens}}
+        finally:
+            app.state.in_flight -= 1
+
+    return app
+
+
+class StubServer:
+    """
+    Runs a stub app with uvicorn in a background thread.
+    """
+
+    def __init__(self, port: int, **options):
+        self.app = create_app(**options)
+        self.url = f"http://127.0.0.1:{port}/v1/completions"
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    parser.add_argument("--decode-delay", type=float, default=0.0)
+    parser.add_argument("--defect-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(
+            args.latency, args.fail_rate, args.token_delay, args.decode_delay, args.defect_rate
+        ),
+        host="127.0.0.1",
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Steady-state chat traffic against the weak-concept cache: users alternate
+chat turns (the weak-concept lookup in prepare_chat) and quiz submits
+through the real submit_quiz handler. Counts concept_mastery SELECTs per
+chat turn and lookup latency, uncached (every turn queries) versus
+app/services/adaptive.py's write-through cache, and checks every cached
+list against the SQL answer at the end.
+
+    python -m bench.weak_cache --users 50 --concepts 200 --turns 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db import models
+from app.db.database import Base, create_db_engine
+from app.routes.quiz import submit_quiz
+from app.services import mastery
+from app.services.adaptive import get_weak_concepts, weak_concept_cache
+from app.utils.deps import Principal
+
+
+def uncached(db, user_id: int, subject: str):
+    return [
+        {"concept": r["concept"], "accuracy": r["accuracy"]}
+        for r in mastery.weak_concepts(
+            db, user_id, subject=subject, limit=settings.WEAK_CONCEPTS_LIMIT
+        )
+    ]
+
+
+def seed(Session, users: int, concepts: int) -> list[tuple[int, int]]:
+    with Session() as db:
+        db.add_all(
+            models.User(email=f"student{i}@example.com", hashed_password="x")
+            for i in range(users)
+        )
+        rows = [
+            models.Quiz(
+                user_id=1 + i % users, subject="DBMS", question=f"Concept {i}?",
+                options='["A", "B", "C", "D"]', correct_answer="A",
+            )
+            for i in range(users * concepts)
+        ]
+        db.add_all(rows)
+        db.flush()
+        quizzes = [(row.id, row.user_id) for row in rows]
+        db.commit()
+    return quizzes
+
+
+def run(lookup, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'weak.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        quizzes = seed(Session, args.users, args.concepts)
+        weak_concept_cache.store.clear()
+
+        queries = [0]
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().startswith("SELECT") and "concept_mastery" in statement:
+                queries[0] += 1
+
+        rng = random.Random(0)
+        with Session() as db:
+            # warm up: every user has answered a few quizzes and chatted once
+            for quiz_id, user_id in rng.sample(quizzes, args.users * 10):
+                submit_quiz(quiz_id=quiz_id, selected_answer=rng.choice("AB"),
+                            db=db, user=Principal(user_id, None))
+            for user_id in range(1, args.users + 1):
+                lookup(db, user_id, "DBMS")
+
+            queries[0], lookups = 0, []
+            for _ in range(args.turns):
+                if rng.random() < args.submit_ratio:
+                    quiz_id, user_id = rng.choice(quizzes)
+                    submit_quiz(quiz_id=quiz_id, selected_answer=rng.choice("AAB"),
+                                db=db, user=Principal(user_id, None))
+                else:
+                    user_id = rng.randint(1, args.users)
+                    start = time.perf_counter()
+                    lookup(db, user_id, "DBMS")
+                    lookups.append(time.perf_counter() - start)
+            chat_queries = queries[0]
+
+            stale = sum(
+                get_weak_concepts(db, user_id, "DBMS") != uncached(db, user_id, "DBMS")
+                for user_id in range(1, args.users + 1)
+            )
+        engine.dispose()
+
+    return {
+        "queries_per_chat": chat_queries / len(lookups),
+        "lookup_us": sum(lookups) / len(lookups) * 1e6,
+        "stale": stale,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concepts", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=5000)
+    parser.add_argument("--submit-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"{args.users} users x {args.concepts} concepts, {args.turns} turns, "
+          f"{args.submit_ratio:.0%} submits")
+    print(f"{'lookup':<12}{'mastery SELECTs/chat':>22}{'lookup':>12}{'stale lists':>13}")
+
+    failed = False
+    for label, lookup in (("uncached", uncached), ("cached", get_weak_concepts)):
+        r = run(lookup, args)
+        print(f"{label:<12}{r['queries_per_chat']:>22.3f}{r['lookup_us']:>10.0f}us{r['stale']:>13}")
+        failed = failed or bool(r["stale"])
+    print(weak_concept_cache.stats())
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,42 @@
 import os
-from app.services.rag import extract_text_from_pdf, chunk_text, store_pdf_vectors
+from app.services.rag import document_key, ingest_pdf
+from app.services.vector_store import vector_store
+from app.utils.embeddings import engine
 
 PDF_DIR = "ingest_pdfs"
 
 
 def ingest_all_pdfs():
-    all_chunks = []
-
-    for filename in os.listdir(PDF_DIR):
-        if filename.lower().endswith(".pdf"):
-            path = os.path.join(PDF_DIR, filename)
-            print(f"[+] Ingesting {filename}")
-
-            text = extract_text_from_pdf(path)
-            chunks = chunk_text(text)
-            all_chunks.extend(chunks)
-
-    store_pdf_vectors(all_chunks)
-    print(f"[✓] Ingested {len(all_chunks)} chunks from PDFs")
+    total_chunks = 0
+    seen = set()
+
+    with engine.multi_process(), vector_store.writer() as writer:
+        for filename in sorted(os.listdir(PDF_DIR)):
+            if filename.lower().endswith(".pdf"):
+                path = os.path.join(PDF_DIR, filename)
+                seen.add(document_key(path))
+
+                chunks = ingest_pdf(path, writer)
+                if chunks:
+                    print(f"[+] Ingested {filename} ({chunks} chunks)")
+                total_chunks += chunks
+
+        # drop documents whose file was deleted from PDF_DIR
+        prefix = document_key(PDF_DIR) + "/"
+        for key in list(writer.documents):
+            if key.startswith(prefix) and key not in seen:
+                print(f"[-] Removing {key}")
+                writer.remove(key)
+
+    print(f"[✓] Ingested {total_chunks} new chunks from {len(seen)} PDFs")
+
+    stats = engine.stats()
+    if stats["texts"]:
+        print(
+            f"[i] Embedded {stats['texts']} chunks in {stats['seconds']}s "
+            f"({stats['texts_per_sec']} chunks/sec, batch size {engine.batch_size}, "
+            f"{max(engine.processes, 1)} process(es))"
+        )
 
 
 if __name__ == "__main__":